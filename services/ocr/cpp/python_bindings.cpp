@@ -39,6 +39,28 @@ Image numpy_to_image(py::array_t<uint8_t> input) {
     return img;
 }
 
+// Helper function to convert a 2D (height, width) or 3D numpy array to Image
+Image grayscale_numpy_to_image(py::array_t<uint8_t, py::array::c_style | py::array::forcecast> input) {
+    if (input.ndim() != 2) {
+        return numpy_to_image(input);
+    }
+    
+    int height = input.shape(0);
+    int width = input.shape(1);
+    
+    Image img(width, height, 1);
+    
+    const uint8_t* input_ptr = input.data();
+    
+    for (int y = 0; y < height; ++y) {
+        for (int x = 0; x < width; ++x) {
+            img.pixel(x, y)[0] = input_ptr[y * width + x];
+        }
+    }
+    
+    return img;
+}
+
 // Helper function to convert Image to numpy array
 py::array_t<uint8_t> image_to_numpy(const Image& img) {
     auto result = py::array_t<uint8_t>(
@@ -159,8 +181,8 @@ PYBIND11_MODULE(billbox_preprocessing, m) {
         return image_to_numpy(result);
     }, "Convert to grayscale using luminance method", py::arg("image"));
     
-    m.def("threshold_otsu", [](py::array_t<uint8_t> input_array) {
-        Image img = numpy_to_image(input_array);
+    m.def("threshold_otsu", [](py::array_t<uint8_t, py::array::c_style | py::array::forcecast> input_array) {
+        Image img = grayscale_numpy_to_image(input_array);
         Image result = threshold_otsu(img);
         return image_to_numpy(result);
     }, "Apply Otsu's thresholding", py::arg("image"));
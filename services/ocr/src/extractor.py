@@ -4,16 +4,40 @@ Data Extractor for BillBox - Invoice Information Extraction
 Uses regex patterns and text analysis to extract key invoice data from OCR text
 """
 
+import os
 import re
+import sys
 import logging
-from typing import Dict, List, Optional, Union, Tuple, Pattern
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from decimal import Decimal, InvalidOperation
+import functools
+import itertools
+import threading
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Sequence, Union, Tuple, Pattern
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_FLOOR
 import calendar
 
+# Hyperscan screens all patterns in a single pass over the text - optional
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
 
-@dataclass
+# Aho-Corasick finds every required literal in one pass over the text - optional
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+# __slots__ dataclasses drop the per-instance __dict__ (Python 3.10+)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class ExtractedData:
     """Container for extracted invoice data"""
     amount: Optional[Decimal] = None
@@ -21,70 +45,247 @@ class ExtractedData:
     vendor: Optional[str] = None
     
     # Additional metadata
-    confidence_scores: Dict[str, float] = None
-    raw_matches: Dict[str, List[str]] = None
-    extraction_notes: List[str] = None
-    
-    def __post_init__(self):
-        if self.confidence_scores is None:
-            self.confidence_scores = {}
-        if self.raw_matches is None:
-            self.raw_matches = {}
-        if self.extraction_notes is None:
-            self.extraction_notes = []
+    confidence_scores: Dict[str, float] = field(default_factory=dict)
+    raw_matches: Dict[str, List[str]] = field(default_factory=dict)
+    extraction_notes: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class ExtractionConfig:
-    """Configuration for data extraction"""
+    """Configuration for data extraction (immutable and hashable - sequences are stored as tuples)"""
     # Amount extraction settings
-    currency_symbols: List[str] = None
-    amount_keywords: List[str] = None
+    currency_symbols: Sequence[str] = None
+    amount_keywords: Sequence[str] = None
     max_amount_value: float = 1000000.0  # Maximum reasonable amount
     
     # Date extraction settings
-    date_formats: List[str] = None
+    date_formats: Sequence[str] = None
     max_days_future: int = 365  # Maximum days in future for due dates
     max_days_past: int = 30     # Maximum days in past for due dates
     
     # Vendor extraction settings
-    vendor_keywords: List[str] = None
-    exclude_vendor_words: List[str] = None
+    vendor_keywords: Sequence[str] = None
+    exclude_vendor_words: Sequence[str] = None
     max_vendor_length: int = 100
     
     # General settings
     case_sensitive: bool = False
+    cache_size: int = 1024         # Extraction results memoized per text (0 disables)
+    
+    # Batch settings
+    use_parallel: bool = False     # Extract large batches on a caller-owned executor
+    parallel_min_batch: int = 8    # Smaller batches are not worth the worker startup cost
     
     def __post_init__(self):
+        # Frozen dataclass - defaults are filled in with object.__setattr__
         if self.currency_symbols is None:
-            self.currency_symbols = ['$', 'USD', 'EUR', 'GBP']
+            object.__setattr__(self, 'currency_symbols', ('$', 'USD', 'EUR', 'GBP'))
         
         if self.amount_keywords is None:
-            self.amount_keywords = [
+            object.__setattr__(self, 'amount_keywords', (
                 'total', 'amount', 'due', 'balance', 'sum', 'grand total',
                 'amount due', 'total due', 'invoice total', 'final amount',
                 'net amount', 'gross amount', 'subtotal'
-            ]
+            ))
         
         if self.date_formats is None:
-            self.date_formats = [
+            object.__setattr__(self, 'date_formats', (
                 '%m/%d/%Y', '%d/%m/%Y', '%Y-%m-%d', '%Y/%m/%d',
                 '%m-%d-%Y', '%d-%m-%Y', '%B %d, %Y', '%d %B %Y',
                 '%b %d, %Y', '%d %b %Y', '%m/%d/%y', '%d/%m/%y'
-            ]
+            ))
         
         if self.vendor_keywords is None:
-            self.vendor_keywords = [
+            object.__setattr__(self, 'vendor_keywords', (
                 'from', 'vendor', 'supplier', 'company', 'corporation', 'corp',
                 'inc', 'llc', 'ltd', 'limited', 'business', 'services',
                 'invoice from', 'bill from', 'billed by'
-            ]
+            ))
         
         if self.exclude_vendor_words is None:
-            self.exclude_vendor_words = [
+            object.__setattr__(self, 'exclude_vendor_words', (
                 'customer', 'client', 'bill to', 'ship to', 'invoice',
                 'receipt', 'total', 'amount', 'date', 'due', 'tax'
-            ]
+            ))
+        
+        # Caller-supplied lists are stored as tuples, keeping every config hashable
+        for name in ('currency_symbols', 'amount_keywords', 'date_formats',
+                     'vendor_keywords', 'exclude_vendor_words'):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_pattern_set(
+    case_sensitive: bool,
+    currency_symbols: Tuple[str, ...],
+    amount_keywords: Tuple[str, ...],
+    vendor_keywords: Tuple[str, ...]
+) -> Tuple[Tuple[Pattern, ...], Tuple[Pattern, ...], Tuple[Pattern, ...]]:
+    """
+    Compile amount, date and vendor patterns for a set of extraction settings
+    
+    Cached so extractors with the same settings share one set of compiled patterns
+    
+    Returns:
+        Tuple of (amount_patterns, date_patterns, vendor_patterns)
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    
+    # Amount patterns
+    currency_pattern = '|'.join(re.escape(sym) for sym in currency_symbols)
+    amount_patterns = (
+        # $123.45, �1,234.56, etc.
+        re.compile(rf'({currency_pattern})\s*([0-9,]+\.?[0-9]*)', flags),
+        # 123.45 USD, 1,234.56 EUR, etc.
+        re.compile(rf'([0-9,]+\.?[0-9]*)\s*({currency_pattern})', flags),
+        # Amount: $123.45, Total: 1,234.56, etc.
+        re.compile(rf'(?:{"| ".join(amount_keywords)})\s*:?\s*({currency_pattern})?\s*([0-9,]+\.?[0-9]*)', flags),
+        # Standalone decimal numbers (lower confidence) - disabled to avoid partial matches
+        # re.compile(r'(?<![0-9])([0-9,]{1,3}(?:,[0-9]{3})*\.?[0-9]{0,2})(?![0-9])', flags)
+    )
+    
+    # Date patterns - improved to handle more variations
+    date_patterns = (
+        # Various date formats with keywords
+        re.compile(r'(?:due\s+date|due|payment\s+due|date\s+due)\s*:?\s*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', flags),
+        re.compile(r'(?:due\s+date|due|payment\s+due|date\s+due)\s*:?\s*([a-zA-Z]{3,9}\s+[0-9]{1,2},?\s+[0-9]{2,4})', flags),
+        # More flexible due date patterns
+        re.compile(r'(?:due\s*by|payment\s*by|pay\s*by)\s*:?\s*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', flags),
+        re.compile(r'(?:due\s*by|payment\s*by|pay\s*by)\s*:?\s*([a-zA-Z]{3,9}\s+[0-9]{1,2},?\s+[0-9]{2,4})', flags),
+        # Standalone date patterns (lower confidence)
+        re.compile(r'([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', flags),
+        re.compile(r'([a-zA-Z]{3,9}\s+[0-9]{1,2},?\s+[0-9]{2,4})', flags),
+        # ISO format dates
+        re.compile(r'([0-9]{4}-[0-9]{1,2}-[0-9]{1,2})', flags)
+    )
+    
+    # Vendor patterns - improved to handle text without newlines
+    vendor_pattern = '|'.join(re.escape(kw) for kw in vendor_keywords)
+    vendor_patterns = (
+        # "From: Company Name", "Vendor: Business Inc", etc. - end at newline, punctuation, or amount keywords
+        re.compile(rf'(?:{vendor_pattern})\s*:?\s*([A-Za-z0-9\s&\.,\-\']+?)(?:\s+(?:Amount|Total|Invoice|Date|Due|\$|\n)|$)', flags),
+        # Company name at start of line - more flexible
+        re.compile(r'^([A-Z][A-Za-z0-9\s&\.,\-\']{2,}?)(?:\s+(?:Amount|Total|Invoice|Date|Due|\$|\n)|$)', re.MULTILINE | flags),
+        # Lines containing business indicators - match just the business name part
+        re.compile(r'([A-Za-z0-9\s&\.,\-\']*(?:Inc|LLC|Ltd|Corp|Corporation|Company|Services|Solutions)(?:\s+[A-Za-z0-9\s&\.,\-\']*)?)', flags),
+        # More flexible pattern but stop at amount/total keywords
+        re.compile(rf'(?:{vendor_pattern})\s*:?\s*([^$\n]*?)(?:\s+(?:Amount|Total|Invoice|Date|Due|\$)|\n|$)', flags)
+    )
+    
+    return amount_patterns, date_patterns, vendor_patterns
+
+
+# Helper patterns used on every extraction
+_WHITESPACE_RE = re.compile(r'\s+')
+_OCR_ARTIFACT_RE = re.compile(r'[^\w\s\.,\-\/\$���&:()]')
+_NON_AMOUNT_CHARS_RE = re.compile(r'[^\d\.,]')
+_VENDOR_EDGE_PUNCTUATION_RE = re.compile(r'^[^\w&\-]+|[^\w&\-]+$')
+
+# Month names as strptime's %B and %b directives understand them
+_MONTH_NAMES = {name.lower(): month for month, name in enumerate(calendar.month_name) if name}
+_MONTH_ABBREVIATIONS = {name.lower(): month for month, name in enumerate(calendar.month_abbr) if name}
+
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Regexes for the strptime directives handled without strptime (same as CPython's _strptime)
+_DATE_DIRECTIVES = {
+    'd': r'(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])',
+    'm': r'(?P<m>1[0-2]|0[1-9]|[1-9])',
+    'y': r'(?P<y>\d\d)',
+    'Y': r'(?P<Y>\d\d\d\d)',
+    'B': '(?P<B>' + '|'.join(re.escape(name) for name in sorted(_MONTH_NAMES, key=len, reverse=True)) + ')',
+    'b': '(?P<b>' + '|'.join(re.escape(name) for name in sorted(_MONTH_ABBREVIATIONS, key=len, reverse=True)) + ')',
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_date_format(date_format: str) -> Optional[Pattern]:
+    """
+    Translate a strptime format into a regex with named groups
+    
+    Returns:
+        Compiled regex, or None if the format uses directives not handled here
+    """
+    parts = []
+    i = 0
+    while i < len(date_format):
+        char = date_format[i]
+        if char == '%':
+            directive = date_format[i + 1:i + 2]
+            if directive == '%':
+                parts.append('%')
+            elif directive in _DATE_DIRECTIVES:
+                parts.append(_DATE_DIRECTIVES[directive])
+            else:
+                return None
+            i += 2
+        elif char.isspace():
+            parts.append(r'\s+')
+            while i < len(date_format) and date_format[i].isspace():
+                i += 1
+        else:
+            parts.append(re.escape(char))
+            i += 1
+    
+    try:
+        return re.compile(''.join(parts), re.IGNORECASE)
+    except re.error:  # Repeated directives
+        return None
+
+
+def _parse_date(date_str: str, date_format: str) -> Optional[datetime]:
+    """
+    Parse a date string like datetime.strptime, without exceptions for mismatches
+    
+    Args:
+        date_str: Date text captured by a date pattern
+        date_format: strptime format
+        
+    Returns:
+        Parsed datetime, or None if the string does not match the format
+    """
+    regex = _compile_date_format(date_format)
+    if regex is None:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            return None
+    
+    found = regex.match(date_str)
+    if found is None or found.end() != len(date_str):
+        return None
+    groups = found.groupdict()
+    
+    if 'Y' in groups:
+        year = int(groups['Y'])
+    elif 'y' in groups:
+        year = int(groups['y'])
+        year += 2000 if year <= 68 else 1900  # strptime's two-digit year pivot
+    else:
+        year = 1900
+    
+    if 'm' in groups:
+        month = int(groups['m'])
+    elif 'B' in groups:
+        month = _MONTH_NAMES[groups['B'].lower()]
+    elif 'b' in groups:
+        month = _MONTH_ABBREVIATIONS[groups['b'].lower()]
+    else:
+        month = 1
+    
+    day = int(groups['d']) if 'd' in groups else 1
+    
+    # Check the calendar up front instead of letting datetime raise on e.g. February 30
+    days_in_month = _DAYS_IN_MONTH[month] + (month == 2 and calendar.isleap(year))
+    if year < 1 or day > days_in_month:
+        return None
+    return datetime(year, month, day)
+
+
+@functools.lru_cache(maxsize=None)
+def _max_amount_units(max_amount_value: float, scale: int) -> int:
+    """Largest amount in units of 10**-scale that does not exceed max_amount_value"""
+    return int((Decimal(max_amount_value) * 10 ** scale).to_integral_value(rounding=ROUND_FLOOR))
 
 
 class InvoiceExtractor:
@@ -99,75 +300,219 @@ class InvoiceExtractor:
         
         # Compile regex patterns for performance
         self._compile_patterns()
+        self._build_result_cache()
+    
+    def __getstate__(self):
+        # Hyperscan databases and caches cannot be pickled - worker processes rebuild theirs
+        state = self.__dict__.copy()
+        state['_scan_db'] = None
+        state['_scan_scratch'] = None
+        state['_extract_cached'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._scan_db = self._build_scan_database()
+        self._scan_scratch = threading.local()
+        self._build_result_cache()
+    
+    def _build_result_cache(self) -> None:
+        """Wrap text extraction in an LRU cache sized by the configuration"""
+        self._extract_cached = None
+        if self.config.cache_size > 0:
+            self._extract_cached = functools.lru_cache(maxsize=self.config.cache_size)(self._extract_text)
     
     def _compile_patterns(self) -> None:
         """Compile regex patterns for better performance"""
-        flags = 0 if self.config.case_sensitive else re.IGNORECASE
-        
-        # Amount patterns
-        currency_pattern = '|'.join(re.escape(sym) for sym in self.config.currency_symbols)
-        self.amount_patterns = [
-            # $123.45, �1,234.56, etc.
-            re.compile(rf'({currency_pattern})\s*([0-9,]+\.?[0-9]*)', flags),
-            # 123.45 USD, 1,234.56 EUR, etc.
-            re.compile(rf'([0-9,]+\.?[0-9]*)\s*({currency_pattern})', flags),
-            # Amount: $123.45, Total: 1,234.56, etc.
-            re.compile(rf'(?:{"| ".join(self.config.amount_keywords)})\s*:?\s*({currency_pattern})?\s*([0-9,]+\.?[0-9]*)', flags),
-            # Standalone decimal numbers (lower confidence) - disabled to avoid partial matches
-            # re.compile(r'(?<![0-9])([0-9,]{1,3}(?:,[0-9]{3})*\.?[0-9]{0,2})(?![0-9])', flags)
-        ]
-        
-        # Date patterns - improved to handle more variations
-        self.date_patterns = [
-            # Various date formats with keywords
-            re.compile(r'(?:due\s+date|due|payment\s+due|date\s+due)\s*:?\s*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', flags),
-            re.compile(r'(?:due\s+date|due|payment\s+due|date\s+due)\s*:?\s*([a-zA-Z]{3,9}\s+[0-9]{1,2},?\s+[0-9]{2,4})', flags),
-            # More flexible due date patterns
-            re.compile(r'(?:due\s*by|payment\s*by|pay\s*by)\s*:?\s*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', flags),
-            re.compile(r'(?:due\s*by|payment\s*by|pay\s*by)\s*:?\s*([a-zA-Z]{3,9}\s+[0-9]{1,2},?\s+[0-9]{2,4})', flags),
-            # Standalone date patterns (lower confidence)
-            re.compile(r'([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', flags),
-            re.compile(r'([a-zA-Z]{3,9}\s+[0-9]{1,2},?\s+[0-9]{2,4})', flags),
-            # ISO format dates
-            re.compile(r'([0-9]{4}-[0-9]{1,2}-[0-9]{1,2})', flags)
-        ]
-        
-        # Vendor patterns - improved to handle text without newlines
-        vendor_keywords = '|'.join(re.escape(kw) for kw in self.config.vendor_keywords)
-        self.vendor_patterns = [
-            # "From: Company Name", "Vendor: Business Inc", etc. - end at newline, punctuation, or amount keywords
-            re.compile(rf'(?:{vendor_keywords})\s*:?\s*([A-Za-z0-9\s&\.,\-\']+?)(?:\s+(?:Amount|Total|Invoice|Date|Due|\$|\n)|$)', flags),
-            # Company name at start of line - more flexible
-            re.compile(r'^([A-Z][A-Za-z0-9\s&\.,\-\']{2,}?)(?:\s+(?:Amount|Total|Invoice|Date|Due|\$|\n)|$)', re.MULTILINE | flags),
-            # Lines containing business indicators - match just the business name part
-            re.compile(r'([A-Za-z0-9\s&\.,\-\']*(?:Inc|LLC|Ltd|Corp|Corporation|Company|Services|Solutions)(?:\s+[A-Za-z0-9\s&\.,\-\']*)?)', flags),
-            # More flexible pattern but stop at amount/total keywords
-            re.compile(rf'(?:{vendor_keywords})\s*:?\s*([^$\n]*?)(?:\s+(?:Amount|Total|Invoice|Date|Due|\$)|\n|$)', flags)
-        ]
-    
-    def extract(self, text: str) -> ExtractedData:
+        self.amount_patterns, self.date_patterns, self.vendor_patterns = _compile_pattern_set(
+            self.config.case_sensitive,
+            tuple(self.config.currency_symbols),
+            tuple(self.config.amount_keywords),
+            tuple(self.config.vendor_keywords)
+        )
+        
+        self._scan_patterns = self.amount_patterns + self.date_patterns + self.vendor_patterns
+        self._scan_db = self._build_scan_database()
+        self._scan_scratch = threading.local()  # Per-thread Hyperscan scratch space
+        self._build_literal_prefilter()
+    
+    def _build_literal_prefilter(self) -> None:
+        """
+        Collect the literals that each pattern category needs before it can match
+        
+        Every amount pattern needs a digit plus a currency symbol or amount keyword,
+        and every date pattern needs a digit. Vendor patterns have no required literal.
+        """
+        fold = (lambda literal: literal) if self.config.case_sensitive else str.lower
+        self._literal_categories: Dict[str, set] = {}
+        for literal in '0123456789':
+            self._literal_categories.setdefault(literal, set()).add('digit')
+        for literal in [*self.config.currency_symbols, *(kw.strip() for kw in self.config.amount_keywords)]:
+            if literal:
+                self._literal_categories.setdefault(fold(literal), set()).add('amount')
+        
+        self._literal_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._literal_automaton = ahocorasick.Automaton()
+            for literal in self._literal_categories:
+                self._literal_automaton.add_word(literal, literal)
+            self._literal_automaton.make_automaton()
+        
+        # Vendor exclusion words are matched in one pass over each candidate
+        self._exclusion_automaton = None
+        if AHOCORASICK_AVAILABLE and all(self.config.exclude_vendor_words):
+            self._exclusion_automaton = ahocorasick.Automaton()
+            for exclude_word in self.config.exclude_vendor_words:
+                self._exclusion_automaton.add_word(exclude_word, exclude_word)
+            self._exclusion_automaton.make_automaton()
+    
+    def _active_categories(self, text: str, text_lower: Optional[str] = None) -> set:
+        """
+        Find the pattern categories whose required literals occur in text
+        
+        Args:
+            text: Cleaned OCR text
+            text_lower: Lowercased text, if already computed
+            
+        Returns:
+            Subset of {'amount', 'date'} worth running regex for
+        """
+        # Like the Hyperscan prefilter, only ASCII text is screened - IGNORECASE folds 'ſ' and
+        # the Kelvin sign onto ASCII letters and \d matches non-ASCII digits, which str.lower misses
+        if not text.isascii():
+            return {'amount', 'date'}
+        
+        if not self.config.case_sensitive:
+            text = text_lower if text_lower is not None else text.lower()
+        
+        if self._literal_automaton is not None:
+            found_literals = {literal for _, literal in self._literal_automaton.iter(text)}
+        else:
+            found_literals = {literal for literal in self._literal_categories if literal in text}
+        
+        found = set()
+        for literal in found_literals:
+            found |= self._literal_categories[literal]
+        
+        if 'digit' not in found:
+            return set()
+        return {'amount', 'date'} if 'amount' in found else {'date'}
+    
+    def _build_scan_database(self):
+        """
+        Compile all patterns into one Hyperscan database used as a prefilter
+        
+        Returns:
+            Hyperscan database, or None when Hyperscan is unavailable
+        """
+        if not HYPERSCAN_AVAILABLE:
+            return None
+        
+        # Prefilter mode reports a superset of the matches of each pattern, so only
+        # patterns that Hyperscan rules out are skipped - results are unchanged
+        base_flags = hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SINGLEMATCH
+        expressions, flags = [], []
+        for pattern in self._scan_patterns:
+            pattern_flags = base_flags
+            if pattern.flags & re.IGNORECASE:
+                pattern_flags |= hyperscan.HS_FLAG_CASELESS
+            if pattern.flags & re.MULTILINE:
+                pattern_flags |= hyperscan.HS_FLAG_MULTILINE
+            expressions.append(pattern.pattern.encode('utf-8'))
+            flags.append(pattern_flags)
+        
+        try:
+            database = hyperscan.Database()
+            database.compile(expressions=expressions, ids=list(range(len(expressions))), flags=flags)
+            return database
+        except hyperscan.error as e:
+            self.logger.warning("Hyperscan compilation failed, using regex only: %s", e)
+            return None
+    
+    def _scan_candidates(self, text: str) -> Optional[set]:
+        """
+        Find the patterns that can match text with a single Hyperscan pass
+        
+        Args:
+            text: Cleaned OCR text
+            
+        Returns:
+            Set of candidate compiled patterns, or None to try every pattern
+        """
+        # Python's IGNORECASE also folds a few non-ASCII letters onto ASCII ones ('İ', 'ſ',
+        # the Kelvin sign) - Hyperscan does not, so only ASCII text is prefiltered
+        if self._scan_db is None or not text.isascii():
+            return None
+        
+        matched_ids = set()
+        
+        def on_match(pattern_id, start, end, flags, context):
+            matched_ids.add(pattern_id)
+        
+        # A scratch space serves one scan at a time, so each thread scans with its own clone
+        scratch = getattr(self._scan_scratch, 'scratch', None)
+        if scratch is None:
+            scratch = self._scan_scratch.scratch = self._scan_db.scratch.clone()
+        
+        self._scan_db.scan(text.encode('utf-8'), match_event_handler=on_match, scratch=scratch)
+        return {self._scan_patterns[pattern_id] for pattern_id in matched_ids}
+    
+    def extract(self, text: Union[str, bytes]) -> ExtractedData:
         """
         Extract key data from OCR text
         
         Args:
-            text: Raw OCR text from invoice
+            text: Raw OCR text from invoice (UTF-8 bytes are decoded on demand)
             
         Returns:
             ExtractedData with extracted information
         """
-        result = ExtractedData()
+        if isinstance(text, bytes):
+            text = text.decode('utf-8', errors='replace')
+        
+        # Blank pages skip cleaning, pattern screening and the cache entirely
+        if not text or text.isspace():
+            return ExtractedData(extraction_notes=["Empty or whitespace-only text provided"])
+        
+        if self._extract_cached is None:
+            return self._extract_text(text)
+        
+        # Due date validation depends on the current day, so it is part of the key.
+        # Callers may modify the result, so each call gets its own copy
+        cached = self._extract_cached(text, date.today().toordinal())
+        return ExtractedData(
+            amount=cached.amount,
+            due_date=cached.due_date,
+            vendor=cached.vendor,
+            confidence_scores=dict(cached.confidence_scores),
+            raw_matches={key: list(matches) for key, matches in cached.raw_matches.items()},
+            extraction_notes=list(cached.extraction_notes)
+        )
+    
+    def _extract_text(self, text: str, day: Optional[int] = None) -> ExtractedData:
+        """
+        Extract key data from decoded, non-blank OCR text
         
-        if not text or not text.strip():
-            result.extraction_notes.append("Empty or whitespace-only text provided")
-            return result
+        Args:
+            text: OCR text
+            day: Ordinal of the current day, only used as part of the cache key
+            
+        Returns:
+            ExtractedData with extracted information
+        """
+        result = ExtractedData()
         
-        # Clean and normalize text
+        # Clean and normalize text - case-insensitive checks share one lowercased copy
         cleaned_text = self._clean_text(text)
+        text_lower = cleaned_text.lower()
         
-        # Extract each type of data
-        result.amount = self._extract_amount(cleaned_text, result)
-        result.due_date = self._extract_due_date(cleaned_text, result)
-        result.vendor = self._extract_vendor(cleaned_text, result)
+        # Screen all patterns at once, then extract each type of data - categories
+        # missing their required literals run no patterns at all
+        candidates = self._scan_candidates(cleaned_text)
+        active = self._active_categories(cleaned_text, text_lower)
+        result.amount = self._extract_amount(cleaned_text, result, candidates if 'amount' in active else set())
+        result.due_date = self._extract_due_date(cleaned_text, result, candidates if 'date' in active else set(), text_lower)
+        result.vendor = self._extract_vendor(cleaned_text, result, candidates, text_lower)
         
         # Calculate overall confidence scores
         self._calculate_confidence_scores(result)
@@ -176,23 +521,21 @@ class InvoiceExtractor:
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text for better extraction"""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Normalize line breaks
-        text = re.sub(r'\r\n', '\n', text)
-        text = re.sub(r'\r', '\n', text)
+        # Remove excessive whitespace - line breaks are collapsed too, so no \r handling is needed
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Remove common OCR artifacts but preserve important business characters
-        text = re.sub(r'[^\w\s\.,\-\/\$���&:()]', ' ', text)
+        text = _OCR_ARTIFACT_RE.sub(' ', text)
         
         return text.strip()
     
-    def _extract_amount(self, text: str, result: ExtractedData) -> Optional[Decimal]:
+    def _extract_amount(self, text: str, result: ExtractedData, candidates: Optional[set] = None) -> Optional[Decimal]:
         """Extract monetary amount from text"""
         amounts_found = []
         
         for i, pattern in enumerate(self.amount_patterns):
+            if candidates is not None and pattern not in candidates:
+                continue
             matches = pattern.findall(text)
             
             for match in matches:
@@ -215,7 +558,7 @@ class InvoiceExtractor:
                             continue  # Skip if there's a minus sign before the amount
                     
                     # Clean amount string - preserve commas for proper parsing
-                    amount_str = re.sub(r'[^\d\.,]', '', amount_str)
+                    amount_str = _NON_AMOUNT_CHARS_RE.sub('', amount_str)
                     # Remove commas for decimal conversion but validate format first
                     if ',' in amount_str:
                         # Check if comma usage is valid (thousands separator)
@@ -237,23 +580,28 @@ class InvoiceExtractor:
                     if amount_str.count('.') > 1:
                         continue
                     
-                    amount = Decimal(amount_str)
+                    # Parse to integer minor units (cents for two decimals) - Decimal is built once for the winner
+                    integer_part, _, decimal_part = amount_str.partition('.')
+                    if ',' in decimal_part:
+                        continue
+                    units = int(integer_part + decimal_part)
+                    scale = len(decimal_part)
                     
                     # Validate amount range (must be positive and within limits)
-                    if 0 < amount <= self.config.max_amount_value:
+                    if 0 < units <= _max_amount_units(self.config.max_amount_value, scale):
                         confidence = 1.0 - (i * 0.2)  # Higher patterns have higher confidence
-                        amounts_found.append((amount, confidence, str(match)))
+                        amounts_found.append(((units, scale), confidence, str(match)))
                         
-                except (InvalidOperation, ValueError, TypeError):
+                except (ValueError, TypeError):
                     continue
         
         # Store all matches for debugging
         result.raw_matches['amounts'] = [match[2] for match in amounts_found]
         
         if amounts_found:
-            # Sort by confidence and return highest confidence amount
-            amounts_found.sort(key=lambda x: x[1], reverse=True)
-            best_amount, confidence, raw_match = amounts_found[0]
+            # Pick the highest confidence amount - max() keeps the first of equal scores, like a stable sort
+            (units, scale), confidence, raw_match = max(amounts_found, key=lambda x: x[1])
+            best_amount = Decimal(units).scaleb(-scale)
             
             result.confidence_scores['amount'] = confidence
             result.extraction_notes.append(f"Amount extracted: {best_amount} (confidence: {confidence:.2f})")
@@ -263,12 +611,24 @@ class InvoiceExtractor:
         result.extraction_notes.append("No valid amount found")
         return None
     
-    def _extract_due_date(self, text: str, result: ExtractedData) -> Optional[datetime]:
+    def _extract_due_date(self, text: str, result: ExtractedData, candidates: Optional[set] = None,
+                          text_lower: Optional[str] = None) -> Optional[datetime]:
         """Extract due date from text"""
         dates_found = []
         today = datetime.now()
         
+        # Dates get a confidence boost when the text mentions "due" keywords
+        if text_lower is None:
+            text_lower = text.lower()
+        due_context = any(keyword in text_lower for keyword in ['due', 'payment'])
+        
+        # Validate date range (reasonable due dates)
+        min_date = today - timedelta(days=self.config.max_days_past)
+        max_date = today + timedelta(days=self.config.max_days_future)
+        
         for i, pattern in enumerate(self.date_patterns):
+            if candidates is not None and pattern not in candidates:
+                continue
             matches = pattern.findall(text)
             
             for match in matches:
@@ -276,33 +636,24 @@ class InvoiceExtractor:
                 
                 # Try to parse with different formats
                 for date_format in self.config.date_formats:
-                    try:
-                        parsed_date = datetime.strptime(date_str, date_format)
+                    parsed_date = _parse_date(date_str, date_format)
+                    
+                    if parsed_date is not None and min_date <= parsed_date <= max_date:
+                        confidence = 1.0 - (i * 0.15)  # Higher pattern index = lower confidence
                         
-                        # Validate date range (reasonable due dates)
-                        min_date = today - timedelta(days=self.config.max_days_past)
-                        max_date = today + timedelta(days=self.config.max_days_future)
+                        # Boost confidence for dates with "due" keywords
+                        if due_context:
+                            confidence += 0.2
                         
-                        if min_date <= parsed_date <= max_date:
-                            confidence = 1.0 - (i * 0.15)  # Higher pattern index = lower confidence
-                            
-                            # Boost confidence for dates with "due" keywords
-                            if any(keyword in text.lower() for keyword in ['due', 'payment']):
-                                confidence += 0.2
-                            
-                            dates_found.append((parsed_date, confidence, date_str))
-                            break
-                            
-                    except ValueError:
-                        continue
+                        dates_found.append((parsed_date, confidence, date_str))
+                        break
         
         # Store all matches for debugging
         result.raw_matches['dates'] = [match[2] for match in dates_found]
         
         if dates_found:
-            # Sort by confidence and return highest confidence date
-            dates_found.sort(key=lambda x: x[1], reverse=True)
-            best_date, confidence, raw_match = dates_found[0]
+            # Pick the highest confidence date - max() keeps the first of equal scores, like a stable sort
+            best_date, confidence, raw_match = max(dates_found, key=lambda x: x[1])
             
             result.confidence_scores['due_date'] = confidence
             result.extraction_notes.append(f"Due date extracted: {best_date.strftime('%Y-%m-%d')} (confidence: {confidence:.2f})")
@@ -312,35 +663,42 @@ class InvoiceExtractor:
         result.extraction_notes.append("No valid due date found")
         return None
     
-    def _extract_vendor(self, text: str, result: ExtractedData) -> Optional[str]:
+    def _extract_vendor(self, text: str, result: ExtractedData, candidates: Optional[set] = None,
+                        text_lower: Optional[str] = None) -> Optional[str]:
         """Extract vendor/company name from text"""
         vendors_found = []
-        lines = text.split('\n')
+        if text_lower is None:
+            text_lower = text.lower()
+        header_lines = text_lower.split('\n')[:3]
         
         for i, pattern in enumerate(self.vendor_patterns):
+            if candidates is not None and pattern not in candidates:
+                continue
             matches = pattern.findall(text)
             
             for match in matches:
                 vendor_name = match.strip() if isinstance(match, str) else ' '.join(match).strip()
                 
-                # Clean vendor name
-                vendor_name = self._clean_vendor_name(vendor_name)
+                # Clean vendor name - capitalization can change the length ('ß' -> 'Ss'),
+                # so it is applied before validation and scoring
+                vendor_name = self._capitalize_vendor_name(self._clean_vendor_name(vendor_name))
+                vendor_lower = vendor_name.lower()
                 
-                if self._is_valid_vendor_name(vendor_name):
+                if self._is_valid_vendor_name(vendor_name, vendor_lower):
                     confidence = 1.0 - (i * 0.2)
                     
                     # Boost confidence for vendors found in first few lines
-                    if any(vendor_name.lower() in line.lower() for line in lines[:3]):
+                    if any(vendor_lower in line for line in header_lines):
                         confidence += 0.3
                     
                     # Boost confidence for shorter, cleaner business names
-                    if len(vendor_name) < 50 and not any(word.lower() in vendor_name.lower() 
+                    if len(vendor_name) < 50 and not any(word in vendor_lower 
                                                         for word in ['invoice', 'bill', 'from']):
                         confidence += 0.2
                     
                     # Extra boost for business entity indicators
                     business_indicators = ['llc', 'inc', 'corp', 'ltd', 'company', 'services']
-                    if any(indicator in vendor_name.lower() for indicator in business_indicators):
+                    if any(indicator in vendor_lower for indicator in business_indicators):
                         confidence += 0.1
                     
                     vendors_found.append((vendor_name, confidence, match))
@@ -349,9 +707,8 @@ class InvoiceExtractor:
         result.raw_matches['vendors'] = [match[2] for match in vendors_found]
         
         if vendors_found:
-            # Sort by confidence and return highest confidence vendor
-            vendors_found.sort(key=lambda x: x[1], reverse=True)
-            best_vendor, confidence, raw_match = vendors_found[0]
+            # Pick the highest confidence vendor - max() keeps the first of equal scores, like a stable sort
+            best_vendor, confidence, raw_match = max(vendors_found, key=lambda x: x[1])
             
             result.confidence_scores['vendor'] = confidence
             result.extraction_notes.append(f"Vendor extracted: {best_vendor} (confidence: {confidence:.2f})")
@@ -362,29 +719,38 @@ class InvoiceExtractor:
         return None
     
     def _clean_vendor_name(self, vendor: str) -> str:
-        """Clean and normalize vendor name"""
+        """Clean and normalize vendor name, leaving capitalization to _capitalize_vendor_name"""
         # Remove extra whitespace
-        vendor = re.sub(r'\s+', ' ', vendor).strip()
+        vendor = _WHITESPACE_RE.sub(' ', vendor).strip()
         
         # Remove leading/trailing punctuation but preserve & and -
-        vendor = re.sub(r'^[^\w&\-]+|[^\w&\-]+$', '', vendor)
+        vendor = _VENDOR_EDGE_PUNCTUATION_RE.sub('', vendor)
         
-        # Capitalize properly while preserving special characters
+        # Drop empty parts of hyphenated words
         words = []
         for word in vendor.split():
+            if '-' in word and word != '&':
+                words.append('-'.join(part for part in word.split('-') if part))
+            else:
+                words.append(word)
+        
+        return ' '.join(words)
+    
+    def _capitalize_vendor_name(self, vendor: str) -> str:
+        """Capitalize a cleaned vendor name while preserving special characters"""
+        words = []
+        for word in vendor.split(' '):
             if word in ['&']:
                 words.append(word)
             elif '-' in word:
                 # Handle hyphenated words
-                parts = word.split('-')
-                capitalized_parts = [part.capitalize() for part in parts if part]
-                words.append('-'.join(capitalized_parts))
+                words.append('-'.join(part.capitalize() for part in word.split('-')))
             else:
                 words.append(word.capitalize())
         
         return ' '.join(words)
     
-    def _is_valid_vendor_name(self, vendor: str) -> bool:
+    def _is_valid_vendor_name(self, vendor: str, vendor_lower: Optional[str] = None) -> bool:
         """Validate if string is a reasonable vendor name"""
         if not vendor or len(vendor) < 3:
             return False
@@ -398,13 +764,16 @@ class InvoiceExtractor:
             return False
         
         # Check against exclusion list
-        vendor_lower = vendor.lower()
-        for exclude_word in self.config.exclude_vendor_words:
-            if exclude_word in vendor_lower:
+        if vendor_lower is None:
+            vendor_lower = vendor.lower()
+        if self._exclusion_automaton is not None:
+            if next(self._exclusion_automaton.iter(vendor_lower), None) is not None:
                 return False
+        elif any(exclude_word in vendor_lower for exclude_word in self.config.exclude_vendor_words):
+            return False
         
         # Check if it's just numbers or common non-vendor words
-        if vendor_lower in ['total', 'amount', 'invoice', 'bill', 'receipt', 'payment']:
+        if vendor_lower in ('total', 'amount', 'invoice', 'bill', 'receipt', 'payment'):
             return False
         
         return True
@@ -423,29 +792,50 @@ class InvoiceExtractor:
         total_confidence = sum(result.confidence_scores.values())
         result.confidence_scores['overall'] = total_confidence / 3.0
     
-    def extract_batch(self, texts: List[str]) -> List[ExtractedData]:
+    def extract_batch(self, texts: List[str], executor: Optional[Executor] = None) -> List[ExtractedData]:
         """
         Extract data from multiple texts
         
         Args:
             texts: List of OCR text strings
+            executor: Pool owned by the caller, used for large batches when use_parallel is set
             
         Returns:
-            List of ExtractedData objects
+            List of ExtractedData objects, in input order
         """
-        results = []
-        for i, text in enumerate(texts):
+        if (executor is not None and self.config.use_parallel
+                and len(texts) >= self.config.parallel_min_batch):
+            chunksize = max(1, len(texts) // (4 * (os.cpu_count() or 1)))
             try:
-                result = self.extract(text)
-                result.extraction_notes.append(f"Processed batch item {i}")
-                results.append(result)
+                return list(executor.map(_run_batch_item, itertools.repeat(self.config),
+                                         range(len(texts)), texts, chunksize=chunksize))
             except Exception as e:
-                error_result = ExtractedData()
-                error_result.extraction_notes.append(f"Error processing batch item {i}: {str(e)}")
-                results.append(error_result)
-                self.logger.error(f"Error extracting from batch item {i}: {e}")
+                self.logger.warning("Parallel batch extraction failed, extracting serially: %s", e)
         
-        return results
+        return [self._extract_batch_item(i, text) for i, text in enumerate(texts)]
+    
+    def _extract_batch_item(self, index: int, text: str) -> ExtractedData:
+        """Extract data from one batch item, recording errors instead of raising"""
+        try:
+            result = self.extract(text)
+            result.extraction_notes.append(f"Processed batch item {index}")
+            return result
+        except Exception as e:
+            error_result = ExtractedData()
+            error_result.extraction_notes.append(f"Error processing batch item {index}: {str(e)}")
+            self.logger.error(f"Error extracting from batch item {index}: {e}")
+            return error_result
+
+
+@functools.lru_cache(maxsize=None)
+def _batch_worker_extractor(config: ExtractionConfig) -> InvoiceExtractor:
+    """Extractor used by batch pool workers, built once per worker and configuration"""
+    return InvoiceExtractor(config)
+
+
+def _run_batch_item(config: ExtractionConfig, index: int, text: str) -> ExtractedData:
+    """Pool task extracting one batch item"""
+    return _batch_worker_extractor(config)._extract_batch_item(index, text)
 
 
 def create_invoice_extractor(
@@ -5,13 +5,21 @@ Handles text extraction using OpenCV preprocessing (primary) with C++ preprocess
 Combines robust image preprocessing with Tesseract OCR for optimal text extraction
 """
 
+import os
+import time
 import cv2
 import numpy as np
 import pytesseract
+from PIL import Image
 from typing import Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 import logging
+import threading
+import weakref
+
+from segment_cache import SegmentCache, segment_digest, split_segments
 
 # Import our C++ preprocessing module
 try:
@@ -34,9 +42,9 @@ class OCRResult:
     error_message: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class OCRConfig:
-    """Configuration for OCR engine"""
+    """Configuration for OCR engine (immutable and hashable so engines can be shared)"""
     # Tesseract configuration
     tesseract_config: str = '--oem 3 --psm 6'  # LSTM engine, single uniform block
     language: str = 'eng'
@@ -49,6 +57,16 @@ class OCRConfig:
     include_word_boxes: bool = True
     include_line_boxes: bool = True
     confidence_threshold: float = 0.0  # Minimum confidence to include text
+    
+    # File decoding options
+    reduced_decode_min_bytes: int = 4 * 1024 * 1024  # Files above this may decode at half size
+    min_decode_dpi: float = 200.0  # Never decode below this effective DPI
+    
+    # Segment cache options - reuses text for repeated letterheads/footers
+    # (text pass only, so best paired with word and line boxes disabled)
+    enable_segment_cache: bool = False
+    segment_count: int = 3  # Header, body, footer
+    segment_cache_path: Optional[str] = None  # e.g. ~/.cache/billbox/segments/<vendor>.db
 
 
 class OCREngine:
@@ -65,6 +83,17 @@ class OCREngine:
         # Verify tesseract installation
         self._verify_tesseract()
         
+        # Optional cache of OCR text per image segment - its dbm handle is closed when the
+        # last owner calls close(), or when the engine is garbage collected or the interpreter exits
+        self._owners = 1
+        self._owners_lock = threading.Lock()
+        if self.config.enable_segment_cache:
+            self.segment_cache = SegmentCache(self.config.segment_cache_path)
+            self._segment_cache_finalizer = weakref.finalize(self, self.segment_cache.close)
+        else:
+            self.segment_cache = None
+            self._segment_cache_finalizer = None
+        
         # Setup C++ preprocessing as fallback option if available
         if PREPROCESSING_AVAILABLE and self.config.enable_preprocessing:
             self.preprocessing_config = self._create_preprocessing_config()
@@ -74,6 +103,30 @@ class OCREngine:
             if self.config.enable_preprocessing:
                 self.logger.info("C++ preprocessing not available - using OpenCV primary with minimal fallback")
     
+    def acquire(self) -> 'OCREngine':
+        """Register another owner of a shared engine - each owner calls close() once"""
+        with self._owners_lock:
+            self._owners += 1
+        return self
+    
+    def close(self) -> None:
+        """Release one owner's hold, closing the persistent segment cache once no owner is left"""
+        with self._owners_lock:
+            if self._owners == 0:
+                return
+            self._owners -= 1
+            if self._owners:
+                return
+        
+        if self._segment_cache_finalizer is not None:
+            self._segment_cache_finalizer()
+    
+    def __enter__(self) -> 'OCREngine':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
     def _verify_tesseract(self) -> None:
         """Verify that tesseract is properly installed"""
         try:
@@ -169,11 +222,9 @@ class OCREngine:
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
         enhanced = clahe.apply(gray)
         
-        # Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(enhanced, (1, 1), 0)
-        
-        # Threshold
-        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Threshold - Otsu's histogram and search run natively inside cv2.threshold.
+        # No blur first: a 1x1 Gaussian kernel is the identity and only copied the image
+        _, thresh = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
         stats['otsu_threshold'] = _
         stats['skew_angle'] = 0.0  # No skew correction in fallback
@@ -299,12 +350,12 @@ class OCREngine:
             # Ensure processed image is in correct format for pytesseract
             processed_image = self._prepare_image_for_ocr(processed_image)
             
-            # Extract text using pytesseract
-            text = pytesseract.image_to_string(
-                processed_image,
-                lang=self.config.language,
-                config=self.config.tesseract_config
-            )
+            # Extract text using pytesseract - raw UTF-8 bytes are stripped
+            # before the single decode instead of decoding then copying
+            if self.segment_cache is not None:
+                text_bytes = self._extract_text_segmented(processed_image)
+            else:
+                text_bytes = self._image_to_bytes(processed_image)
             
             # Get detailed data if requested
             word_boxes = []
@@ -350,7 +401,7 @@ class OCREngine:
                     line_boxes = self._extract_line_boxes(data)
             
             return OCRResult(
-                text=text.strip(),
+                text=text_bytes.decode('utf-8'),  # The only decode of the OCR output
                 confidence=confidence,
                 word_boxes=word_boxes,
                 line_boxes=line_boxes,
@@ -370,6 +421,39 @@ class OCREngine:
                 error_message=str(e)
             )
     
+    def _image_to_bytes(self, image: np.ndarray) -> bytes:
+        """Run tesseract on an image and return its stripped UTF-8 output"""
+        return pytesseract.image_to_string(
+            image,
+            lang=self.config.language,
+            config=self.config.tesseract_config,
+            output_type=pytesseract.Output.BYTES
+        ).strip()
+    
+    def _extract_text_segmented(self, image: np.ndarray) -> bytes:
+        """
+        Extract text segment by segment, reusing cached text for repeated segments
+        
+        Args:
+            image: Image prepared for OCR
+            
+        Returns:
+            Stripped UTF-8 text of all segments in reading order
+        """
+        salt = f"{self.config.language}|{self.config.tesseract_config}|".encode('utf-8')
+        parts = []
+        
+        for segment in split_segments(image, self.config.segment_count):
+            key = segment_digest(segment, salt)
+            text = self.segment_cache.get(key)
+            if text is None:
+                text = self._image_to_bytes(segment)
+                self.segment_cache.put(key, text)
+            if text:
+                parts.append(text)
+        
+        return b'\n'.join(parts)
+    
     def _extract_line_boxes(self, data: Dict) -> List[Dict]:
         """Extract line-level bounding boxes from tesseract data"""
         lines = {}
@@ -446,15 +530,25 @@ class OCREngine:
             if not image_path.exists():
                 raise FileNotFoundError(f"Image file not found: {image_path}")
             
-            # Load image
-            image = cv2.imread(str(image_path))
+            # Load image, letting the decoder downscale oversized scans
+            decode_start = time.perf_counter_ns()
+            imread_flags = self._select_imread_flags(image_path)
+            image = cv2.imread(str(image_path), imread_flags)
             if image is None:
                 raise ValueError(f"Could not load image: {image_path}")
             
             # Convert BGR to RGB
             image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            decode_time_ns = time.perf_counter_ns() - decode_start
+            
+            result = self.extract_text(image)
+            result.preprocessing_stats['decode_time_ns'] = decode_time_ns
+            if imread_flags == cv2.IMREAD_REDUCED_COLOR_2:
+                # Report boxes in the coordinates of the file, not of the reduced decode
+                self._scale_boxes(result, 2)
+                result.preprocessing_stats['decode_scale'] = 0.5
             
-            return self.extract_text(image)
+            return result
             
         except Exception as e:
             return OCRResult(
@@ -467,6 +561,42 @@ class OCREngine:
                 error_message=f"Failed to process file {image_path}: {e}"
             )
     
+    @staticmethod
+    def _scale_boxes(result: OCRResult, factor: int) -> None:
+        """Scale word and line box coordinates in place"""
+        for box in result.word_boxes + result.line_boxes:
+            for key in ('x', 'y', 'width', 'height'):
+                box[key] *= factor
+    
+    def _select_imread_flags(self, image_path: Path) -> int:
+        """
+        Choose cv2.imread flags for an image file
+        
+        Large scans are decoded at half resolution inside the codec when the
+        result still meets the minimum DPI, which halves decode memory and all
+        downstream preprocessing work. Files without DPI metadata are always
+        decoded at full size.
+        
+        Args:
+            image_path: Path to image file
+            
+        Returns:
+            cv2.IMREAD_REDUCED_COLOR_2 or cv2.IMREAD_COLOR
+        """
+        if image_path.stat().st_size <= self.config.reduced_decode_min_bytes:
+            return cv2.IMREAD_COLOR
+        
+        try:
+            # Only the header is read here - pixel data stays on disk
+            with Image.open(image_path) as header:
+                dpi = header.info.get('dpi', (0, 0))[0]
+        except Exception:
+            return cv2.IMREAD_COLOR
+        
+        if dpi and dpi / 2 >= self.config.min_decode_dpi:
+            return cv2.IMREAD_REDUCED_COLOR_2
+        return cv2.IMREAD_COLOR
+    
     def batch_process(self, image_paths: List[Union[str, Path]]) -> List[OCRResult]:
         """
         Process multiple images
@@ -484,6 +614,30 @@ class OCREngine:
             self.logger.info(f"Processed {image_path}: {'✓' if result.success else '✗'}")
         
         return results
+    
+    def batch_process_threaded(self, image_paths: List[Union[str, Path]],
+                               max_workers: Optional[int] = None) -> List[OCRResult]:
+        """
+        Process multiple images concurrently on a thread pool
+        
+        Tesseract runs in its own process and OpenCV releases the GIL, so threads
+        overlap several images. Set OMP_THREAD_LIMIT=1 so the concurrent tesseract
+        processes do not oversubscribe the cores.
+        
+        Args:
+            image_paths: List of paths to image files
+            max_workers: Number of worker threads (defaults to the CPU count)
+            
+        Returns:
+            List of OCRResult objects, in the same order as image_paths
+        """
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            results = list(executor.map(self.process_image_file, image_paths))
+        
+        for image_path, result in zip(image_paths, results):
+            self.logger.info(f"Processed {image_path}: {'✓' if result.success else '✗'}")
+        
+        return results
 
 
 def create_ocr_engine(
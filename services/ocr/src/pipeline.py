@@ -4,18 +4,44 @@ BillBox Invoice Processing Pipeline
 Combines OCR engine and data extraction to provide a unified interface for processing invoices
 """
 
+import os
+import sys
+import json
+import time
 import logging
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Union, Tuple
 from pathlib import Path
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from decimal import Decimal
 
+import numpy as np
+
 from ocr_engine import OCREngine, OCRConfig, OCRResult, create_ocr_engine
 from extractor import InvoiceExtractor, ExtractionConfig, ExtractedData, create_invoice_extractor
 
+# msgspec encodes API response bytes in C - optional, falls back to json
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# Stage timings are also emitted as OpenTelemetry spans when it is installed
+try:
+    from opentelemetry import trace
+    _TRACER = trace.get_tracer(__name__)
+except ImportError:
+    _TRACER = None
+
+# __slots__ dataclasses drop the per-instance __dict__ (Python 3.10+)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@dataclass(**_DATACLASS_SLOTS)
 class InvoiceData:
     """Final invoice data ready for API consumption"""
     # Core extracted data
@@ -28,22 +54,17 @@ class InvoiceData:
     ocr_confidence: float = 0.0
     
     # Extraction metadata
-    extraction_confidence: Dict[str, float] = None
-    extraction_notes: List[str] = None
+    extraction_confidence: Dict[str, float] = field(default_factory=dict)
+    extraction_notes: List[str] = field(default_factory=list)
     
     # Processing metadata
     processing_success: bool = False
     processing_time_ms: float = 0.0
+    stage_times_ns: Dict[str, int] = field(default_factory=dict)  # decode/ocr/extract/validate
     error_message: Optional[str] = None
-    
-    def __post_init__(self):
-        if self.extraction_confidence is None:
-            self.extraction_confidence = {}
-        if self.extraction_notes is None:
-            self.extraction_notes = []
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class PipelineConfig:
     """Configuration for the invoice processing pipeline"""
     # OCR configuration
@@ -58,6 +79,10 @@ class PipelineConfig:
     require_due_date: bool = False
     require_vendor: bool = False
     
+    # Batch settings
+    use_parallel: bool = False  # Overlap OCR of batch items on a thread pool
+    parallel_min_batch: int = 2  # Smaller batches run serially
+    
     def __post_init__(self):
         if self.ocr_config is None:
             self.ocr_config = OCRConfig(
@@ -72,6 +97,57 @@ class PipelineConfig:
             self.extraction_config = ExtractionConfig()
 
 
+if MSGSPEC_AVAILABLE:
+    class ApiData(msgspec.Struct):
+        """Extracted fields of an API response"""
+        amount: Optional[Decimal]  # Encoded as a JSON number from its exact digits
+        due_date: Optional[datetime]
+        vendor: Optional[str]
+        currency: str = 'USD'
+    
+    class ApiMetadata(msgspec.Struct):
+        """Processing metadata of an API response"""
+        ocr_confidence: float
+        extraction_confidence: Dict[str, float]
+        processing_time_ms: float
+        stage_times_ms: Dict[str, float]
+        text_length: int
+        extraction_notes: List[str]
+    
+    class ApiInvoice(msgspec.Struct):
+        """Complete API response for one processed invoice"""
+        success: bool
+        data: ApiData
+        metadata: ApiMetadata
+        error: Optional[str]
+    
+    _API_ENCODER = msgspec.json.Encoder(decimal_format='number')
+
+
+def _stage_times_ms(invoice_data: InvoiceData) -> Dict[str, float]:
+    """Convert per-stage timings from nanoseconds to milliseconds"""
+    return {stage: elapsed / 1e6 for stage, elapsed in invoice_data.stage_times_ns.items()}
+
+
+def _ocr_batch_workers() -> int:
+    """Threads for batch OCR - each tesseract process uses up to 4 OpenMP threads unless OMP_THREAD_LIMIT caps it"""
+    thread_limit = os.environ.get('OMP_THREAD_LIMIT', '')
+    threads_per_ocr = min(int(thread_limit), 4) if thread_limit.isdigit() and int(thread_limit) > 0 else 4
+    return max(1, (os.cpu_count() or 1) // threads_per_ocr)
+
+
+@functools.lru_cache(maxsize=8)
+def _engine_for(ocr_config: OCRConfig) -> OCREngine:
+    """
+    Return the OCR engine shared by every processor with this OCR configuration
+    
+    The cache holds one reference to each engine and processors acquire their own,
+    so a processor closing the engine never closes it for the others. An evicted
+    engine is released once its last processor is garbage collected.
+    """
+    return OCREngine(ocr_config)
+
+
 class InvoiceProcessor:
     """
     Main pipeline class that orchestrates OCR and data extraction
@@ -82,14 +158,24 @@ class InvoiceProcessor:
         self.config = config or PipelineConfig()
         self.logger = logging.getLogger(__name__)
         
-        # Initialize OCR engine
-        self.ocr_engine = OCREngine(self.config.ocr_config)
+        # Initialize OCR engine (shared between processors with equal OCR configs)
+        self.ocr_engine = _engine_for(self.config.ocr_config).acquire()
         
         # Initialize extractor
         self.extractor = InvoiceExtractor(self.config.extraction_config)
         
         self.logger.info("Invoice processor initialized successfully")
     
+    def close(self) -> None:
+        """Release this processor's hold on its shared OCR engine"""
+        self.ocr_engine.close()
+    
+    def __enter__(self) -> 'InvoiceProcessor':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
     def process_image(self, image_data, source_info: str = "unknown") -> InvoiceData:
         """
         Process an image to extract invoice data
@@ -101,64 +187,191 @@ class InvoiceProcessor:
         Returns:
             InvoiceData with extracted information
         """
-        import time
         start_time = time.time()
         
+        result, extracted_data = self._ocr_and_extract(image_data, source_info, start_time)
+        if extracted_data is None:
+            return result
+        
+        return self._validate_and_finalize(result, extracted_data, start_time)
+    
+    def process_text(self, text: str, ocr_confidence: float = 100.0,
+                     source_info: str = "text") -> InvoiceData:
+        """
+        Process already recognised invoice text, skipping OCR
+        
+        Lets several processors share one OCR pass - their OCR settings
+        are the same, only extraction and validation differ.
+        
+        Args:
+            text: OCR text of the invoice
+            ocr_confidence: Confidence of the OCR that produced the text
+            source_info: Information about the source (for logging)
+            
+        Returns:
+            InvoiceData with extracted information
+        """
+        start_time = time.time()
+        self.logger.info("Processing invoice text from %s", source_info)
+        
+        result, extracted_data = self._extract_from_text(text, ocr_confidence, {}, start_time)
+        if extracted_data is None:
+            return result
+        
+        return self._validate_and_finalize(result, extracted_data, start_time)
+    
+    def _validate_and_finalize(self, result: InvoiceData, extracted_data: ExtractedData,
+                               start_time: float) -> InvoiceData:
+        """
+        Validate extracted data and fill in the final status of a result
+        
+        Args:
+            result: Unvalidated InvoiceData
+            extracted_data: Data extracted by the extractor
+            start_time: time.time() at which processing of this invoice started
+            
+        Returns:
+            The finalized InvoiceData
+        """
+        # Step 3: Validation
+        with self._timer(result.stage_times_ns, 'validate'):
+            validation_result = self._validate_extraction(extracted_data)
+        
+        # Step 4: Finalize result
+        processing_time = (time.time() - start_time) * 1000
+        result.processing_success = validation_result['success']
+        result.processing_time_ms = processing_time
+        result.error_message = validation_result.get('error_message')
+        
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Processing completed in %.1fms - Success: %s",
+                             processing_time, result.processing_success)
+        return result
+    
+    def _ocr_and_extract(self, image_data, source_info: str,
+                         start_time: float) -> Tuple[InvoiceData, Optional[ExtractedData]]:
+        """
+        Run OCR and data extraction for one image, leaving validation to the caller
+        
+        Args:
+            image_data: Image as numpy array or file path
+            source_info: Information about the source (for logging)
+            start_time: time.time() at which processing of this image started
+            
+        Returns:
+            Tuple of (unvalidated InvoiceData, ExtractedData), or (failed InvoiceData, None)
+        """
+        stage_times = {}
+        
         try:
-            self.logger.info(f"Processing invoice from {source_info}")
+            self.logger.info("Processing invoice from %s", source_info)
             
             # Step 1: OCR extraction
-            if isinstance(image_data, (str, Path)):
-                ocr_result = self.ocr_engine.process_image_file(image_data)
-            else:
-                ocr_result = self.ocr_engine.extract_text(image_data)
+            with self._timer(stage_times, 'ocr'):
+                if isinstance(image_data, (str, Path)):
+                    ocr_result = self.ocr_engine.process_image_file(image_data)
+                else:
+                    ocr_result = self.ocr_engine.extract_text(image_data)
+            
+            # File decoding is timed by the engine - report it separately
+            decode_time_ns = ocr_result.preprocessing_stats.get('decode_time_ns')
+            if decode_time_ns is not None:
+                stage_times['decode'] = decode_time_ns
+                stage_times['ocr'] -= decode_time_ns
             
             if not ocr_result.success:
                 return InvoiceData(
                     processing_success=False,
                     error_message=f"OCR failed: {ocr_result.error_message}",
-                    processing_time_ms=(time.time() - start_time) * 1000
-                )
+                    processing_time_ms=(time.time() - start_time) * 1000,
+                    stage_times_ns=stage_times
+                ), None
+            
+        except Exception as e:
+            return self._failed_result(e, stage_times, start_time), None
+        
+        return self._extract_from_text(ocr_result.text, ocr_result.confidence, stage_times, start_time)
+    
+    def _extract_from_text(self, text: str, ocr_confidence: float, stage_times: Dict[str, int],
+                           start_time: float) -> Tuple[InvoiceData, Optional[ExtractedData]]:
+        """
+        Run data extraction on OCR text, leaving validation to the caller
+        
+        Args:
+            text: OCR text of the invoice
+            ocr_confidence: Confidence of the OCR that produced the text
+            stage_times: Stage timings recorded so far for this invoice
+            start_time: time.time() at which processing of this invoice started
             
+        Returns:
+            Tuple of (unvalidated InvoiceData, ExtractedData), or (failed InvoiceData, None)
+        """
+        try:
             # Check OCR confidence
-            if ocr_result.confidence < self.config.min_ocr_confidence:
-                self.logger.warning(f"Low OCR confidence: {ocr_result.confidence:.1f}% (min: {self.config.min_ocr_confidence}%)")
+            if ocr_confidence < self.config.min_ocr_confidence:
+                self.logger.warning("Low OCR confidence: %.1f%% (min: %s%%)",
+                                    ocr_confidence, self.config.min_ocr_confidence)
             
             # Step 2: Text extraction
-            extracted_data = self.extractor.extract(ocr_result.text)
-            
-            # Step 3: Validation
-            validation_result = self._validate_extraction(extracted_data)
-            
-            # Step 4: Create final result
-            processing_time = (time.time() - start_time) * 1000
+            with self._timer(stage_times, 'extract'):
+                extracted_data = self.extractor.extract(text)
             
             result = InvoiceData(
                 amount=extracted_data.amount,
                 due_date=extracted_data.due_date,
                 vendor=extracted_data.vendor,
-                ocr_text=ocr_result.text,
-                ocr_confidence=ocr_result.confidence,
+                ocr_text=text,  # Shared reference, not a copy
+                ocr_confidence=ocr_confidence,
                 extraction_confidence=extracted_data.confidence_scores,
                 extraction_notes=extracted_data.extraction_notes,
-                processing_success=validation_result['success'],
-                processing_time_ms=processing_time,
-                error_message=validation_result.get('error_message')
+                processing_time_ms=(time.time() - start_time) * 1000,
+                stage_times_ns=stage_times
             )
-            
-            self.logger.info(f"Processing completed in {processing_time:.1f}ms - Success: {result.processing_success}")
-            return result
+            return result, extracted_data
             
         except Exception as e:
-            processing_time = (time.time() - start_time) * 1000
-            error_msg = f"Pipeline processing failed: {str(e)}"
-            self.logger.error(error_msg)
+            return self._failed_result(e, stage_times, start_time), None
+    
+    def _failed_result(self, error: Exception, stage_times: Dict[str, int],
+                       start_time: float) -> InvoiceData:
+        """
+        Build the InvoiceData reported when a processing step raised
+        
+        Args:
+            error: The exception raised by the pipeline
+            stage_times: Stage timings recorded before the failure
+            start_time: time.time() at which processing of this invoice started
             
-            return InvoiceData(
-                processing_success=False,
-                error_message=error_msg,
-                processing_time_ms=processing_time
-            )
+        Returns:
+            Failed InvoiceData carrying the error message
+        """
+        processing_time = (time.time() - start_time) * 1000
+        error_msg = f"Pipeline processing failed: {str(error)}"
+        self.logger.error(error_msg)
+        
+        return InvoiceData(
+            processing_success=False,
+            error_message=error_msg,
+            processing_time_ms=processing_time,
+            stage_times_ns=stage_times
+        )
+    
+    @contextlib.contextmanager
+    def _timer(self, stage_times: Dict[str, int], stage: str):
+        """
+        Time a processing stage with perf_counter_ns
+        
+        Args:
+            stage_times: Dictionary receiving the elapsed nanoseconds
+            stage: Stage name ('decode', 'ocr', 'extract', 'validate')
+        """
+        span = _TRACER.start_as_current_span(f"billbox.{stage}") if _TRACER else contextlib.nullcontext()
+        with span:
+            start = time.perf_counter_ns()
+            try:
+                yield
+            finally:
+                stage_times[stage] = time.perf_counter_ns() - start
     
     def _validate_extraction(self, extracted_data: ExtractedData) -> Dict:
         """
@@ -190,7 +403,6 @@ class InvoiceProcessor:
         # Validate due date if present
         if extracted_data.due_date is not None:
             # Check if date is reasonable (not too far in past or future)
-            from datetime import timedelta
             today = datetime.now()
             min_date = today - timedelta(days=30)
             max_date = today + timedelta(days=365)
@@ -206,6 +418,45 @@ class InvoiceProcessor:
         
         return result
     
+    def validate_batch(self, extracted: List[ExtractedData]) -> np.ndarray:
+        """
+        Validate many extractions in one vectorized pass
+        
+        Applies the same rules as _validate_extraction without per-invoice branching
+        
+        Args:
+            extracted: Data extracted by the extractor
+            
+        Returns:
+            Boolean array, True where the extraction passes validation
+        """
+        count = len(extracted)
+        today = datetime.now()
+        min_ts = (today - timedelta(days=30)).timestamp()
+        max_ts = (today + timedelta(days=365)).timestamp()
+        
+        # Missing values become NaN, which fails every comparison below
+        amounts = np.fromiter(
+            (float(e.amount) if e.amount is not None else np.nan for e in extracted),
+            dtype=np.float64, count=count
+        )
+        dates = np.fromiter(
+            (e.due_date.timestamp() if e.due_date is not None else np.nan for e in extracted),
+            dtype=np.float64, count=count
+        )
+        
+        valid = ~(amounts <= 0) & ~((dates < min_ts) | (dates > max_ts))
+        
+        # Check required fields
+        if self.config.require_amount:
+            valid &= ~np.isnan(amounts)
+        if self.config.require_due_date:
+            valid &= ~np.isnan(dates)
+        if self.config.require_vendor:
+            valid &= np.fromiter((e.vendor is not None for e in extracted), dtype=bool, count=count)
+        
+        return valid
+    
     def process_batch(self, image_sources: List) -> List[InvoiceData]:
         """
         Process multiple invoices
@@ -216,31 +467,65 @@ class InvoiceProcessor:
         Returns:
             List of InvoiceData objects
         """
-        results = []
+        source_infos = [str(image_source) if isinstance(image_source, (str, Path)) else f"batch_item_{i}"
+                        for i, image_source in enumerate(image_sources)]
+        
+        def process_item(image_source, source_info):
+            return self._ocr_and_extract(image_source, source_info, time.time())
+        
+        # OCR runs in tesseract subprocesses and OpenCV releases the GIL, so threads
+        # overlap batch items while sharing this processor's engine and extractor
+        if self.config.use_parallel and len(image_sources) >= self.config.parallel_min_batch:
+            workers = min(len(image_sources), _ocr_batch_workers())
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                processed = list(executor.map(process_item, image_sources, source_infos))
+        else:
+            processed = [process_item(image_source, source_info)
+                         for image_source, source_info in zip(image_sources, source_infos)]
+        
+        results = [result for result, _ in processed]
+        extracted = [extracted_data for _, extracted_data in processed]
         
-        for i, image_source in enumerate(image_sources):
-            source_info = f"batch_item_{i}"
-            if isinstance(image_source, (str, Path)):
-                source_info = str(image_source)
+        # Validate every successful extraction at once; detailed error
+        # messages are only built for the ones that fail
+        pending = [i for i, extracted_data in enumerate(extracted) if extracted_data is not None]
+        if pending:
+            batch_times = {}
+            with self._timer(batch_times, 'validate'):
+                valid = self.validate_batch([extracted[i] for i in pending])
             
-            result = self.process_image(image_source, source_info)
-            results.append(result)
+            # The vectorized pass is shared, so each item is charged an equal part of it
+            share_ns = batch_times['validate'] // len(pending)
+            for i, is_valid in zip(pending, valid.tolist()):
+                stage_times = results[i].stage_times_ns
+                stage_times['validate'] = share_ns
+                results[i].processing_success = is_valid
+                if not is_valid:
+                    message_times = {}
+                    with self._timer(message_times, 'validate'):
+                        results[i].error_message = self._validate_extraction(extracted[i]).get('error_message')
+                    stage_times['validate'] += message_times['validate']
+                results[i].processing_time_ms += stage_times['validate'] / 1e6
         
         success_count = sum(1 for r in results if r.processing_success)
-        self.logger.info(f"Batch processing completed: {success_count}/{len(results)} successful")
+        self.logger.info("Batch processing completed: %d/%d successful", success_count, len(results))
         
         return results
     
-    def get_api_ready_data(self, invoice_data: InvoiceData) -> Dict:
+    def get_api_ready_data(self, invoice_data: InvoiceData, as_bytes: bool = False) -> Union[Dict, bytes]:
         """
         Convert InvoiceData to dictionary format ready for backend API
         
         Args:
             invoice_data: Processed invoice data
+            as_bytes: Return the response encoded as JSON bytes (see get_api_ready_bytes)
             
         Returns:
-            Dictionary formatted for API consumption
+            Dictionary formatted for API consumption, or its JSON encoding
         """
+        if as_bytes:
+            return self.get_api_ready_bytes(invoice_data)
+        
         return {
             'success': invoice_data.processing_success,
             'data': {
@@ -253,11 +538,46 @@ class InvoiceProcessor:
                 'ocr_confidence': invoice_data.ocr_confidence,
                 'extraction_confidence': invoice_data.extraction_confidence,
                 'processing_time_ms': invoice_data.processing_time_ms,
+                'stage_times_ms': _stage_times_ms(invoice_data),
                 'text_length': len(invoice_data.ocr_text),
                 'extraction_notes': invoice_data.extraction_notes
             },
             'error': invoice_data.error_message if not invoice_data.processing_success else None
         }
+    
+    def get_api_ready_bytes(self, invoice_data: InvoiceData) -> bytes:
+        """
+        Encode InvoiceData as a JSON response body for the backend API
+        
+        Carries the same data as get_api_ready_data. With msgspec the amount is
+        written straight from its Decimal digits, skipping the float conversion.
+        
+        Args:
+            invoice_data: Processed invoice data
+            
+        Returns:
+            UTF-8 encoded JSON
+        """
+        if not MSGSPEC_AVAILABLE:
+            return json.dumps(self.get_api_ready_data(invoice_data)).encode('utf-8')
+        
+        return _API_ENCODER.encode(ApiInvoice(
+            success=invoice_data.processing_success,
+            data=ApiData(
+                amount=invoice_data.amount if invoice_data.amount else None,
+                due_date=invoice_data.due_date,
+                vendor=invoice_data.vendor
+            ),
+            metadata=ApiMetadata(
+                ocr_confidence=invoice_data.ocr_confidence,
+                extraction_confidence=invoice_data.extraction_confidence,
+                processing_time_ms=invoice_data.processing_time_ms,
+                stage_times_ms=_stage_times_ms(invoice_data),
+                text_length=len(invoice_data.ocr_text),
+                extraction_notes=invoice_data.extraction_notes
+            ),
+            error=invoice_data.error_message if not invoice_data.processing_success else None
+        ))
 
 
 def create_invoice_processor(
@@ -330,6 +650,22 @@ def process_invoice_file(file_path: Union[str, Path]) -> Dict:
     return processor.get_api_ready_data(invoice_data)
 
 
+def process_invoice_bytes(image: np.ndarray, source_info: str = "memory") -> Dict:
+    """
+    Quick utility function to process an already decoded invoice image
+    
+    Args:
+        image: Invoice image as an RGB or grayscale numpy array
+        source_info: Information about the source (for logging)
+        
+    Returns:
+        API-ready dictionary with extracted data
+    """
+    processor = DEFAULT_PROCESSOR
+    invoice_data = processor.process_image(image, source_info)
+    return processor.get_api_ready_data(invoice_data)
+
+
 if __name__ == "__main__":
     # Demo usage
     import sys
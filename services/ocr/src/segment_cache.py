@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Segment Cache for BillBox - Reuse OCR text for repeated image regions
+Invoices from the same vendor share letterheads and footers, so OCR output is cached
+per horizontal page segment keyed by a hash of its pixels
+"""
+
+import dbm
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+# xxhash is much faster than blake2b for large pixel buffers - optional
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+
+def segment_digest(segment: np.ndarray, salt: bytes = b"") -> bytes:
+    """
+    Hash the pixels of an image segment
+    
+    Args:
+        segment: Image region as numpy array
+        salt: Extra bytes mixed into the key (e.g. OCR language and config)
+    
+    Returns:
+        16-byte digest identifying the segment
+    """
+    segment = np.ascontiguousarray(segment)
+    header = salt + repr(segment.shape).encode('ascii')
+    
+    if XXHASH_AVAILABLE:
+        hasher = xxhash.xxh3_128(header)
+    else:
+        hasher = hashlib.blake2b(header, digest_size=16)
+    hasher.update(memoryview(segment).cast('B'))
+    return hasher.digest()
+
+
+def split_segments(image: np.ndarray, num_segments: int = 3, search_fraction: float = 0.1) -> List[np.ndarray]:
+    """
+    Split an image into horizontal bands, cutting at blank rows where possible
+    
+    Args:
+        image: Grayscale or multi-channel image (dark text on light background)
+        num_segments: Number of bands (3 = header, body, footer)
+        search_fraction: Fraction of the height searched around each cut for a blank row
+    
+    Returns:
+        List of views into the image, top to bottom
+    """
+    height = image.shape[0]
+    if num_segments <= 1 or height < num_segments:
+        return [image]
+    
+    # Rows without any dark pixel in any channel are safe places to cut
+    blank_rows = np.flatnonzero(image.min(axis=tuple(range(1, image.ndim))) >= 128)
+    window = max(1, int(height * search_fraction))
+    
+    cuts = [0]
+    for i in range(1, num_segments):
+        target = height * i // num_segments
+        candidates = blank_rows[(blank_rows >= target - window) & (blank_rows <= target + window)]
+        cut = int(candidates[np.argmin(np.abs(candidates - target))]) if candidates.size else target
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(height)
+    
+    return [image[top:bottom] for top, bottom in zip(cuts[:-1], cuts[1:]) if bottom > top]
+
+
+class SegmentCache:
+    """
+    OCR text cache for image segments, held in memory and optionally persisted with dbm
+    """
+    
+    def __init__(self, path: Optional[Union[str, Path]] = None, max_entries: int = 1024):
+        """
+        Initialize segment cache
+        
+        Args:
+            path: Optional dbm file for persisting entries across runs
+            max_entries: Maximum number of entries kept in memory
+        """
+        self.max_entries = max_entries
+        self._memory: Dict[bytes, bytes] = {}
+        self._db = None
+        self._lock = threading.Lock()  # Engines may be shared by batch worker threads
+        
+        if path is not None:
+            path = Path(path).expanduser()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = dbm.open(str(path), 'c')
+    
+    def get(self, key: bytes) -> Optional[bytes]:
+        """Return cached OCR text for a segment key, or None"""
+        with self._lock:
+            text = self._memory.get(key)
+            if text is None and self._db is not None:
+                text = self._db.get(key)
+                if text is not None:
+                    self._remember(key, text)
+            return text
+    
+    def put(self, key: bytes, text: bytes) -> None:
+        """Store OCR text for a segment key"""
+        with self._lock:
+            self._remember(key, text)
+            if self._db is not None:
+                self._db[key] = text
+    
+    def _remember(self, key: bytes, text: bytes) -> None:
+        """Add an entry to the in-memory cache, evicting the oldest when full"""
+        if len(self._memory) >= self.max_entries:
+            del self._memory[next(iter(self._memory))]
+        self._memory[key] = text
+    
+    def close(self) -> None:
+        """Close the persistent store, if any"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+    
+    def __len__(self) -> int:
+        return len(self._memory)
@@ -8,11 +8,17 @@ import numpy as np
 import cv2
 import sys
 import os
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import billbox_preprocessing as bp
     print("✓ Successfully imported billbox_preprocessing")
 except ImportError as e:
+    if __name__ != "__main__":
+        # Collected by pytest - skip this module instead of exiting the whole session
+        import pytest
+        pytest.skip(f"billbox_preprocessing not built: {e}", allow_module_level=True)
     print(f"✗ Failed to import billbox_preprocessing: {e}")
     print("Make sure to build and install the Python module first:")
     print("  pip install pybind11")
@@ -27,6 +33,22 @@ except ImportError:
     print("Install with: pip install pytesseract")
     pytesseract = None
 
+# tesserocr keeps one Tesseract instance resident instead of spawning the CLI per call
+try:
+    from tesserocr import PyTessBaseAPI
+    from PIL import Image
+    TESSEROCR_AVAILABLE = True
+    print("✓ tesserocr is available")
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+def ocr_image_to_string(image, api=None):
+    """Run OCR on a numpy image, through a resident tesserocr API when one is given"""
+    if api is not None:
+        api.SetImage(Image.fromarray(image))
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(image)
+
 def load_test_image():
     """Load a test image"""
     # Try to load the example invoice (relative path)
@@ -56,11 +78,11 @@ def load_test_image():
     image[160:180, 50:120] = 0  # Text line 3
     image[210:230, 50:250] = 0  # Text line 4
     
-    # Add some skew by rotating slightly
+    # Add some skew by rotating slightly - nearest neighbour is enough for solid boxes
     center = (image.shape[1]//2, image.shape[0]//2)
     rotation_matrix = cv2.getRotationMatrix2D(center, 3, 1.0)  # 3 degree rotation
     image = cv2.warpAffine(image, rotation_matrix, (image.shape[1], image.shape[0]), 
-                          borderValue=(255, 255, 255))
+                          flags=cv2.INTER_NEAREST, borderValue=(255, 255, 255))
     
     return image
 
@@ -98,14 +120,12 @@ def test_image_processing(image):
         
         # Test thresholding on grayscale
         if len(grayscale.shape) == 3 and grayscale.shape[2] == 1:
-            # Remove channel dimension for thresholding
-            gray_2d = grayscale.squeeze()
-            gray_3d = np.expand_dims(gray_2d, axis=2)
-            binary = bp.threshold_otsu(gray_3d)
+            # threshold_otsu takes the 2D view directly
+            binary = bp.threshold_otsu(grayscale.squeeze())
             print(f"✓ Otsu thresholding: {binary.shape}")
 
-        # Save intermediate image
-        cv2.imwrite("output/intermediate.png", binary)
+        # Save intermediate image - binary PGM skips PNG's zlib pass
+        cv2.imwrite("output/intermediate.pgm", binary)
         
         return True
     except Exception as e:
@@ -138,42 +158,47 @@ def test_pipeline_processing(image, config):
         return None, None
 
 def test_ocr_integration(original_image, processed_image):
-    """Test OCR with pytesseract"""
-    if pytesseract is None:
+    """Test OCR with tesserocr or pytesseract"""
+    if pytesseract is None and not TESSEROCR_AVAILABLE:
         print("\n=== Skipping OCR Test (pytesseract not available) ===")
         return
     
     print("\n=== Testing OCR Integration ===")
     
     try:
-        # Convert images for pytesseract (expects PIL format or file path)
-        # Convert to PIL format via cv2
-        
-        # Original image OCR
-        original_bgr = cv2.cvtColor(original_image, cv2.COLOR_RGB2BGR)
-        original_text = pytesseract.image_to_string(original_bgr)
-        
-        # Processed image OCR
-        if len(processed_image.shape) == 3:
-            if processed_image.shape[2] == 1:
+        with contextlib.ExitStack() as stack:
+            # One tesserocr instance serves both images and is released when the block exits
+            api = None
+            if TESSEROCR_AVAILABLE:
+                try:
+                    api = stack.enter_context(PyTessBaseAPI())
+                except RuntimeError:
+                    pass  # No usable tessdata - fall back to pytesseract
+            
+            # Convert images for pytesseract (expects PIL format or file path)
+            # Convert to PIL format via cv2
+            
+            # Original image OCR
+            original_bgr = cv2.cvtColor(original_image, cv2.COLOR_RGB2BGR)
+            original_text = ocr_image_to_string(original_bgr, api)
+            
+            # Processed image OCR - Tesseract converts colour input to grayscale itself
+            if len(processed_image.shape) == 3 and processed_image.shape[2] == 1:
                 # Grayscale
                 processed_for_ocr = processed_image.squeeze()
             else:
-                # Convert to grayscale
-                processed_for_ocr = cv2.cvtColor(processed_image, cv2.COLOR_RGB2GRAY)
-        else:
-            processed_for_ocr = processed_image
+                processed_for_ocr = processed_image
+            
+            processed_text = ocr_image_to_string(processed_for_ocr, api)
+            
+            print("✓ OCR completed")
+            print(f"Original text length: {len(original_text.strip())} characters")
+            print(f"Processed text length: {len(processed_text.strip())} characters")
+            
+            if len(processed_text.strip()) > 0:
+                print("Sample processed text:")
+                print(processed_text[:200] + "..." if len(processed_text) > 200 else processed_text)
             
-        processed_text = pytesseract.image_to_string(processed_for_ocr)
-        
-        print("✓ OCR completed")
-        print(f"Original text length: {len(original_text.strip())} characters")
-        print(f"Processed text length: {len(processed_text.strip())} characters")
-        
-        if len(processed_text.strip()) > 0:
-            print("Sample processed text:")
-            print(processed_text[:200] + "..." if len(processed_text) > 200 else processed_text)
-        
     except Exception as e:
         print(f"✗ OCR test failed: {e}")
 
@@ -184,25 +209,28 @@ def save_results(original_image, processed_image, result):
     try:
         os.makedirs("output", exist_ok=True)
         
-        # Save original
-        cv2.imwrite("output/original.png", 
-                   cv2.cvtColor(original_image, cv2.COLOR_RGB2BGR))
+        # Original
+        tasks = [("output/original.png", cv2.cvtColor(original_image, cv2.COLOR_RGB2BGR))]
         
-        # Save processed
+        # Processed
         if len(processed_image.shape) == 3 and processed_image.shape[2] == 1:
             # Single channel
-            cv2.imwrite("output/processed.png", processed_image.squeeze())
+            tasks.append(("output/processed.png", processed_image.squeeze()))
         else:
-            cv2.imwrite("output/processed.png", 
-                       cv2.cvtColor(processed_image, cv2.COLOR_RGB2BGR))
+            tasks.append(("output/processed.png", 
+                          cv2.cvtColor(processed_image, cv2.COLOR_RGB2BGR)))
         
-        # Save intermediate steps if available
+        # Intermediate steps if available
         if result and result.intermediate_steps:
             for i, step_name in enumerate(result.step_names):
                 step_image = result.get_intermediate_numpy(i)
                 if len(step_image.shape) == 3 and step_image.shape[2] == 1:
                     step_image = step_image.squeeze()
-                cv2.imwrite(f"output/{step_name}.png", step_image)
+                tasks.append((f"output/{step_name}.png", step_image))
+        
+        # PNG encoding releases the GIL, so the writes run in parallel
+        with ThreadPoolExecutor(max_workers=min(8, len(tasks))) as executor:
+            list(executor.map(lambda task: cv2.imwrite(*task), tasks))
         
         print("✓ Results saved to output/")
         
@@ -7,9 +7,11 @@ Comprehensive tests for amount, due date, and vendor extraction functionality
 import os
 import sys
 import unittest
+from parameterized import parameterized
 from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
+from concurrent.futures import ProcessPoolExecutor
 
 # Add src to path so we can import our modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -17,7 +19,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 try:
     from extractor import (
         InvoiceExtractor, ExtractionConfig, ExtractedData,
-        create_invoice_extractor,
+        create_invoice_extractor, _parse_date,
         DEFAULT_EXTRACTOR, STRICT_EXTRACTOR, LENIENT_EXTRACTOR
     )
     print("✓ Successfully imported extractor modules")
@@ -52,6 +54,7 @@ class TestExtractionConfig(unittest.TestCase):
         # Test default settings
         self.assertFalse(config.case_sensitive)
         self.assertEqual(config.max_vendor_length, 100)
+        self.assertFalse(config.use_parallel)
     
     def test_custom_config(self):
         """Test custom configuration values"""
@@ -61,7 +64,9 @@ class TestExtractionConfig(unittest.TestCase):
             max_amount_value=50000.0
         )
         
-        self.assertEqual(config.currency_symbols, ['€', 'EUR'])
+        self.assertEqual(config.currency_symbols, ('€', 'EUR'))
+        self.assertEqual(hash(config), hash(ExtractionConfig(currency_symbols=('€', 'EUR'),
+                                                             case_sensitive=True, max_amount_value=50000.0)))
         self.assertTrue(config.case_sensitive)
         self.assertEqual(config.max_amount_value, 50000.0)
 
@@ -99,11 +104,20 @@ class TestExtractedData(unittest.TestCase):
 class TestInvoiceExtractor(unittest.TestCase):
     """Test cases for InvoiceExtractor main functionality"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.extractor = InvoiceExtractor()
-        self.config = ExtractionConfig()
-        self.custom_extractor = InvoiceExtractor(self.config)
+    _PREFILTER_TEXTS = (
+        "ACME Corporation Invoice Total: $1,234.56 Due Date: 12/31/2099",
+        "From: Test Company LLC Amount Due: 500.00 USD",
+        "Bill from Zed Services payment due by March 3, 2099 EUR 45.00",
+        "nothing to extract here",
+        "\u0130stanbul Trading Date: 2099-12-31",  # 'İ' matches [A-Z] only under Python's IGNORECASE
+    )
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared fixtures - patterns are compiled once per class"""
+        cls.extractor = DEFAULT_EXTRACTOR
+        cls.config = ExtractionConfig()
+        cls.custom_extractor = InvoiceExtractor(cls.config)
     
     def test_extractor_initialization(self):
         """Test extractor initialization"""
@@ -112,6 +126,27 @@ class TestInvoiceExtractor(unittest.TestCase):
         self.assertIsNotNone(self.extractor.date_patterns)
         self.assertIsNotNone(self.extractor.vendor_patterns)
     
+    def test_compiled_patterns_shared(self):
+        """Test that extractors with the same settings share compiled patterns"""
+        self.assertIs(self.custom_extractor.amount_patterns, self.extractor.amount_patterns)
+        self.assertIs(self.custom_extractor.vendor_patterns, self.extractor.vendor_patterns)
+        self.assertIsNot(STRICT_EXTRACTOR.amount_patterns, self.extractor.amount_patterns)
+    
+    def test_result_cache(self):
+        """Test that repeated texts are served from the cache as independent copies"""
+        extractor = InvoiceExtractor()
+        first = extractor.extract("Total: $100.00 From: Test Company Inc")
+        first.extraction_notes.append("Processed batch item 0")
+        second = extractor.extract("Total: $100.00 From: Test Company Inc")
+        
+        self.assertEqual(extractor._extract_cached.cache_info().hits, 1)
+        self.assertEqual(second.amount, first.amount)
+        self.assertNotIn("Processed batch item 0", second.extraction_notes)
+        
+        uncached = InvoiceExtractor(ExtractionConfig(cache_size=0))
+        self.assertIsNone(uncached._extract_cached)
+        self.assertEqual(uncached.extract("Total: $100.00").amount, Decimal('100.00'))
+    
     def test_empty_text_extraction(self):
         """Test extraction with empty or whitespace text"""
         result = self.extractor.extract("")
@@ -122,71 +157,108 @@ class TestInvoiceExtractor(unittest.TestCase):
         
         result = self.extractor.extract("   \n\t  ")
         self.assertIn("Empty or whitespace-only text provided", result.extraction_notes)
-
-
-class TestAmountExtraction(unittest.TestCase):
-    """Test cases for amount extraction functionality"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.extractor = InvoiceExtractor()
+    def test_bytes_text_extraction(self):
+        """Test extraction from UTF-8 encoded OCR output"""
+        result = self.extractor.extract("Total: $123.45".encode('utf-8'))
+        self.assertEqual(result.amount, Decimal('123.45'))
     
-    def test_basic_amount_extraction(self):
-        """Test basic amount patterns"""
-        test_cases = [
-            ("Total: $123.45", Decimal('123.45')),
-            ("Amount due: $1,234.56", Decimal('1234.56')),
-            ("Invoice total $999.99", Decimal('999.99')),
-            ("TOTAL: $50.00", Decimal('50.00')),
-            ("Amount: 789.12 USD", Decimal('789.12')),
-        ]
+    def test_prefilter_parity(self):
+        """Test that the multi-pattern prefilter does not change extraction results"""
+        regex_only = InvoiceExtractor()
+        regex_only._scan_db = None
         
-        for text, expected_amount in test_cases:
+        for text in self._PREFILTER_TEXTS:
             with self.subTest(text=text):
+                expected = regex_only.extract(text)
                 result = self.extractor.extract(text)
-                self.assertEqual(result.amount, expected_amount)
-                self.assertGreater(result.confidence_scores.get('amount', 0), 0)
+                self.assertEqual(result.amount, expected.amount)
+                self.assertEqual(result.due_date, expected.due_date)
+                self.assertEqual(result.vendor, expected.vendor)
+                self.assertEqual(result.raw_matches, expected.raw_matches)
     
-    def test_currency_symbols(self):
-        """Test different currency symbols"""
-        test_cases = [
-            ("Total: $100.00", Decimal('100.00')),
-            ("Amount: 100.00 USD", Decimal('100.00')),
-            ("Total: 100.00 EUR", Decimal('100.00')),
-            ("Amount: 100.00 GBP", Decimal('100.00')),
-        ]
+    def test_literal_prefilter_categories(self):
+        """Test that categories without their required literals are skipped"""
+        self.assertEqual(self.extractor._active_categories("From: Acme Corporation"), set())
+        self.assertEqual(self.extractor._active_categories("Pay by 12/31/2099"), {'date'})
+        self.assertEqual(self.extractor._active_categories("TOTAL 500.00"), {'amount', 'date'})
         
-        for text, expected_amount in test_cases:
-            with self.subTest(text=text):
-                result = self.extractor.extract(text)
-                self.assertEqual(result.amount, expected_amount)
-    
-    def test_amount_with_commas(self):
-        """Test amounts with comma separators"""
-        test_cases = [
-            ("Total: $1,234.56", Decimal('1234.56')),
-            ("Amount: $12,345.67", Decimal('12345.67')),
-            ("Invoice: $1,000.00", Decimal('1000.00')),
-        ]
+        # IGNORECASE matches 'ſum' as 'sum' - non-ASCII text is never screened out
+        self.assertEqual(self.extractor._active_categories("Invoice \u017fum: 42"), {'amount', 'date'})
+        self.assertEqual(self.extractor.extract("Invoice \u017fum: 42").amount, Decimal('42'))
         
-        for text, expected_amount in test_cases:
-            with self.subTest(text=text):
-                result = self.extractor.extract(text)
-                self.assertEqual(result.amount, expected_amount)
+        result = self.extractor.extract("Thank you for your business")
+        self.assertEqual(result.raw_matches['amounts'], [])
+        self.assertEqual(result.raw_matches['dates'], [])
+        self.assertIn("No valid amount found", result.extraction_notes)
+
+
+class TestAmountExtraction(unittest.TestCase):
+    """Test cases for amount extraction functionality"""
     
-    def test_invalid_amounts(self):
+    _PRECISION_CASES = (
+        ("Total: $100", "100"),
+        ("Total: $100.50", "100.50"),
+        ("Total: $12.345", "12.345"),
+        ("Total: $1000000.00", "1000000.00"),  # Exactly max_amount_value
+    )
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared fixtures"""
+        cls.extractor = DEFAULT_EXTRACTOR
+    
+    @parameterized.expand([
+        ("Total: $123.45", Decimal('123.45')),
+        ("Amount due: $1,234.56", Decimal('1234.56')),
+        ("Invoice total $999.99", Decimal('999.99')),
+        ("TOTAL: $50.00", Decimal('50.00')),
+        ("Amount: 789.12 USD", Decimal('789.12')),
+    ])
+    def test_basic_amount_extraction(self, text, expected_amount):
+        """Test basic amount patterns"""
+        result = self.extractor.extract(text)
+        self.assertEqual(result.amount, expected_amount)
+        self.assertGreater(result.confidence_scores.get('amount', 0), 0)
+    
+    @parameterized.expand([
+        ("Total: $100.00", Decimal('100.00')),
+        ("Amount: 100.00 USD", Decimal('100.00')),
+        ("Total: 100.00 EUR", Decimal('100.00')),
+        ("Amount: 100.00 GBP", Decimal('100.00')),
+    ])
+    def test_currency_symbols(self, text, expected_amount):
+        """Test different currency symbols"""
+        result = self.extractor.extract(text)
+        self.assertEqual(result.amount, expected_amount)
+    
+    @parameterized.expand([
+        ("Total: $1,234.56", Decimal('1234.56')),
+        ("Amount: $12,345.67", Decimal('12345.67')),
+        ("Invoice: $1,000.00", Decimal('1000.00')),
+    ])
+    def test_amount_with_commas(self, text, expected_amount):
+        """Test amounts with comma separators"""
+        result = self.extractor.extract(text)
+        self.assertEqual(result.amount, expected_amount)
+    
+    @parameterized.expand([
+        "Total: $0.00",  # Zero amount
+        "Amount: $-123.45",  # Negative amount
+        "Total: $9999999.99",  # Too large (exceeds max_amount_value)
+        "Invoice: abc.def",  # Non-numeric
+    ])
+    def test_invalid_amounts(self, text):
         """Test that invalid amounts are rejected"""
-        invalid_texts = [
-            "Total: $0.00",  # Zero amount
-            "Amount: $-123.45",  # Negative amount
-            "Total: $9999999.99",  # Too large (exceeds max_amount_value)
-            "Invoice: abc.def",  # Non-numeric
-        ]
-        
-        for text in invalid_texts:
+        result = self.extractor.extract(text)
+        self.assertIsNone(result.amount)
+    
+    def test_amount_precision(self):
+        """Test that parsed amounts keep the digits written on the invoice"""
+        for text, expected_amount in self._PRECISION_CASES:
             with self.subTest(text=text):
                 result = self.extractor.extract(text)
-                self.assertIsNone(result.amount)
+                self.assertEqual(str(result.amount), expected_amount)
     
     def test_multiple_amounts_confidence(self):
         """Test confidence scoring with multiple amounts"""
@@ -202,64 +274,77 @@ class TestAmountExtraction(unittest.TestCase):
 class TestDateExtraction(unittest.TestCase):
     """Test cases for due date extraction functionality"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.extractor = InvoiceExtractor()
-        self.today = datetime.now()
+    _PARSER_CASES = (
+        ("12/31/2024", '%m/%d/%Y'),
+        ("31/12/2024", '%m/%d/%Y'),  # Invalid month
+        ("2024-02-29", '%Y-%m-%d'),
+        ("2023-02-29", '%Y-%m-%d'),  # Not a leap year
+        ("December 31, 2024", '%B %d, %Y'),
+        ("dec  31, 2024", '%b %d, %Y'),
+        ("1/5/69", '%m/%d/%y'),
+        ("1/5/68", '%m/%d/%y'),
+        ("12/31/2024 extra", '%m/%d/%Y'),
+        ("2024 366", '%Y %j'),  # Unsupported directive falls back to strptime
+    )
+    
+    _BASIC_DATE_CASES = (
+        ("Due date: 12/31/2024", "2024-12-31"),
+        ("Payment due: 01/15/2025", "2025-01-15"),
+        ("Due: December 31, 2024", "2024-12-31"),
+        ("Date due: Jan 15, 2025", "2025-01-15"),
+    )
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared fixtures"""
+        cls.extractor = DEFAULT_EXTRACTOR
+    
+    def test_date_parser_matches_strptime(self):
+        """Test that the regex date parser agrees with datetime.strptime"""
+        for date_str, date_format in self._PARSER_CASES:
+            with self.subTest(date_str=date_str, date_format=date_format):
+                try:
+                    expected = datetime.strptime(date_str, date_format)
+                except ValueError:
+                    expected = None
+                self.assertEqual(_parse_date(date_str, date_format), expected)
     
     def test_basic_date_extraction(self):
         """Test basic date patterns"""
-        future_date = self.today + timedelta(days=30)
-        test_cases = [
-            ("Due date: 12/31/2024", "2024-12-31"),
-            ("Payment due: 01/15/2025", "2025-01-15"),
-            ("Due: December 31, 2024", "2024-12-31"),
-            ("Date due: Jan 15, 2025", "2025-01-15"),
-        ]
-        
-        for text, expected_date_str in test_cases:
+        for text, expected_date_str in self._BASIC_DATE_CASES:
             with self.subTest(text=text):
                 result = self.extractor.extract(text)
                 if result.due_date:
                     self.assertEqual(result.due_date.strftime('%Y-%m-%d'), expected_date_str)
                     self.assertGreater(result.confidence_scores.get('due_date', 0), 0)
     
-    def test_date_formats(self):
+    @parameterized.expand([
+        "Due: 12/31/2024",  # MM/DD/YYYY
+        "Due: 31/12/2024",  # DD/MM/YYYY  
+        "Due: 2024-12-31",  # YYYY-MM-DD
+        "Due: December 31, 2024",  # Month DD, YYYY
+        "Due: 31 December 2024",  # DD Month YYYY
+    ])
+    def test_date_formats(self, text):
         """Test various date formats"""
-        test_cases = [
-            "Due: 12/31/2024",  # MM/DD/YYYY
-            "Due: 31/12/2024",  # DD/MM/YYYY  
-            "Due: 2024-12-31",  # YYYY-MM-DD
-            "Due: December 31, 2024",  # Month DD, YYYY
-            "Due: 31 December 2024",  # DD Month YYYY
-        ]
-        
-        for text in test_cases:
-            with self.subTest(text=text):
-                result = self.extractor.extract(text)
-                # Should extract some date (format parsing may vary)
-                self.assertIn('due_date', result.confidence_scores)
+        result = self.extractor.extract(text)
+        # Should extract some date (format parsing may vary)
+        self.assertIn('due_date', result.confidence_scores)
     
-    def test_invalid_dates(self):
+    @parameterized.expand([
+        f"Due: {(datetime.now() - timedelta(days=100)).strftime('%m/%d/%Y')}",  # Too far in past
+        f"Due: {(datetime.now() + timedelta(days=500)).strftime('%m/%d/%Y')}",  # Too far in future
+        "Due: 13/32/2024",  # Invalid month/day
+        "Due: February 30, 2024",  # Invalid date
+        "Due: abc/def/ghij",  # Non-numeric
+    ])
+    def test_invalid_dates(self, text):
         """Test that invalid dates are rejected"""
-        past_date = self.today - timedelta(days=100)
-        far_future_date = self.today + timedelta(days=500)
-        
-        invalid_texts = [
-            f"Due: {past_date.strftime('%m/%d/%Y')}",  # Too far in past
-            f"Due: {far_future_date.strftime('%m/%d/%Y')}",  # Too far in future
-            "Due: 13/32/2024",  # Invalid month/day
-            "Due: February 30, 2024",  # Invalid date
-            "Due: abc/def/ghij",  # Non-numeric
-        ]
-        
-        for text in invalid_texts:
-            with self.subTest(text=text):
-                result = self.extractor.extract(text)
-                # Some invalid dates might still be parsed, but should have low confidence
-                # or be rejected entirely
-                if result.due_date is None:
-                    self.assertEqual(result.confidence_scores.get('due_date', 0), 0)
+        result = self.extractor.extract(text)
+        # Some invalid dates might still be parsed, but should have low confidence
+        # or be rejected entirely
+        if result.due_date is None:
+            self.assertEqual(result.confidence_scores.get('due_date', 0), 0)
     
     def test_date_with_keywords(self):
         """Test dates with due-related keywords get higher confidence"""
@@ -280,24 +365,22 @@ class TestDateExtraction(unittest.TestCase):
 class TestVendorExtraction(unittest.TestCase):
     """Test cases for vendor extraction functionality"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.extractor = InvoiceExtractor()
-    
-    def test_basic_vendor_extraction(self):
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared fixtures"""
+        cls.extractor = DEFAULT_EXTRACTOR
+    
+    @parameterized.expand([
+        ("From: Acme Corporation", "Acme Corporation"),
+        ("Vendor: Smith & Associates LLC", "Smith & Associates Llc"),
+        ("Company: Tech Solutions Inc", "Tech Solutions Inc"),
+        ("Bill from: ABC Services", "Abc Services"),
+    ])
+    def test_basic_vendor_extraction(self, text, expected_vendor):
         """Test basic vendor patterns"""
-        test_cases = [
-            ("From: Acme Corporation", "Acme Corporation"),
-            ("Vendor: Smith & Associates LLC", "Smith & Associates Llc"),
-            ("Company: Tech Solutions Inc", "Tech Solutions Inc"),
-            ("Bill from: ABC Services", "Abc Services"),
-        ]
-        
-        for text, expected_vendor in test_cases:
-            with self.subTest(text=text):
-                result = self.extractor.extract(text)
-                self.assertEqual(result.vendor, expected_vendor)
-                self.assertGreater(result.confidence_scores.get('vendor', 0), 0)
+        result = self.extractor.extract(text)
+        self.assertEqual(result.vendor, expected_vendor)
+        self.assertGreater(result.confidence_scores.get('vendor', 0), 0)
     
     def test_vendor_in_header(self):
         """Test vendor extraction from document header"""
@@ -312,58 +395,57 @@ Date: 01/15/2024
         self.assertIsNotNone(result.vendor)
         self.assertIn("acme", result.vendor.lower())
     
-    def test_business_entity_detection(self):
+    def test_vendor_lowercase_matching(self):
+        """Test that vendor matching lowercases rather than casefolds text"""
+        result = self.extractor.extract("Vendor: \ufb01nance Group\nTotal: $12.50")
+        self.assertEqual(result.vendor, "Finance Group")
+        # The header spells the 'fi' ligature, so the capitalized name earns no header boost
+        self.assertAlmostEqual(result.confidence_scores['vendor'], 0.6)
+    
+    @parameterized.expand([
+        "XYZ Services LLC",
+        "ABC Corporation", 
+        "Smith & Associates Inc",
+        "Tech Solutions Company",
+    ])
+    def test_business_entity_detection(self, vendor_text):
         """Test detection of business entity suffixes"""
-        test_cases = [
-            "XYZ Services LLC",
-            "ABC Corporation", 
-            "Smith & Associates Inc",
-            "Tech Solutions Company",
-        ]
-        
-        for vendor_text in test_cases:
-            with self.subTest(vendor=vendor_text):
-                text = f"Invoice from {vendor_text}\nAmount: $100.00"
-                result = self.extractor.extract(text)
-                self.assertIsNotNone(result.vendor)
+        text = f"Invoice from {vendor_text}\nAmount: $100.00"
+        result = self.extractor.extract(text)
+        self.assertIsNotNone(result.vendor)
     
-    def test_invalid_vendors(self):
+    @parameterized.expand([
+        "From: Total",  # Common excluded word
+        "Vendor: 123",  # Just numbers
+        "Company: a",   # Too short
+        "From: Invoice Receipt Payment",  # Multiple excluded words
+    ])
+    def test_invalid_vendors(self, text):
         """Test that invalid vendor names are rejected"""
-        invalid_texts = [
-            "From: Total",  # Common excluded word
-            "Vendor: 123",  # Just numbers
-            "Company: a",   # Too short
-            "From: Invoice Receipt Payment",  # Multiple excluded words
-        ]
-        
-        for text in invalid_texts:
-            with self.subTest(text=text):
-                result = self.extractor.extract(text)
-                # Should either reject the vendor or have very low confidence
-                if result.vendor is None:
-                    self.assertEqual(result.confidence_scores.get('vendor', 0), 0)
-    
-    def test_vendor_cleaning(self):
+        result = self.extractor.extract(text)
+        # Should either reject the vendor or have very low confidence
+        if result.vendor is None:
+            self.assertEqual(result.confidence_scores.get('vendor', 0), 0)
+    
+    @parameterized.expand([
+        ("From:   ACME    CORP   ", "Acme Corp"),
+        ("Vendor: smith & associates", "Smith & Associates"),
+        ("Company: ABC-123 LLC", "Abc-123 Llc"),
+    ])
+    def test_vendor_cleaning(self, text, expected_clean):
         """Test vendor name cleaning and normalization"""
-        test_cases = [
-            ("From:   ACME    CORP   ", "Acme Corp"),
-            ("Vendor: smith & associates", "Smith & Associates"),
-            ("Company: ABC-123 LLC", "Abc-123 Llc"),
-        ]
-        
-        for text, expected_clean in test_cases:
-            with self.subTest(text=text):
-                result = self.extractor.extract(text)
-                if result.vendor:
-                    self.assertEqual(result.vendor, expected_clean)
+        result = self.extractor.extract(text)
+        if result.vendor:
+            self.assertEqual(result.vendor, expected_clean)
 
 
 class TestIntegratedExtraction(unittest.TestCase):
     """Test cases for integrated extraction scenarios"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.extractor = InvoiceExtractor()
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared fixtures"""
+        cls.extractor = DEFAULT_EXTRACTOR
     
     def test_complete_invoice_extraction(self):
         """Test extraction from a complete invoice text"""
@@ -448,9 +530,10 @@ DUE  DATE:  12/31/2024
 class TestBatchProcessing(unittest.TestCase):
     """Test cases for batch processing functionality"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.extractor = InvoiceExtractor()
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared fixtures"""
+        cls.extractor = DEFAULT_EXTRACTOR
     
     def test_batch_extraction(self):
         """Test batch processing of multiple texts"""
@@ -493,6 +576,47 @@ class TestBatchProcessing(unittest.TestCase):
         for result in results:
             self.assertIsInstance(result, ExtractedData)
             self.assertIsInstance(result.extraction_notes, list)
+    
+    def test_parallel_batch_matches_serial(self):
+        """Test that process pool batches preserve order and results"""
+        texts = [f"Invoice {i} Total: ${i + 1}00.00 From: Company {i} Inc" for i in range(10)]
+        texts[3] = ""
+        
+        serial = InvoiceExtractor(ExtractionConfig()).extract_batch(texts)
+        parallel_extractor = InvoiceExtractor(ExtractionConfig(use_parallel=True, parallel_min_batch=2))
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            parallel = parallel_extractor.extract_batch(texts, executor)
+        
+        self.assertEqual(len(parallel), len(texts))
+        for expected, result in zip(serial, parallel):
+            self.assertEqual(result.amount, expected.amount)
+            self.assertEqual(result.vendor, expected.vendor)
+            self.assertEqual(result.extraction_notes, expected.extraction_notes)
+    
+    def test_parallel_batch_list_config(self):
+        """Test that a config built from lists still extracts on the pool"""
+        texts = [f"Total: €{i + 1}00.00" for i in range(4)]
+        config = ExtractionConfig(currency_symbols=['€', 'EUR'], amount_keywords=['total'],
+                                  use_parallel=True, parallel_min_batch=2)
+        extractor = InvoiceExtractor(config)
+        
+        with ProcessPoolExecutor(max_workers=1) as executor, \
+                patch.object(extractor.logger, 'warning') as mock_warning:
+            results = extractor.extract_batch(texts, executor)
+        
+        mock_warning.assert_not_called()  # No silent fallback to serial extraction
+        self.assertEqual([r.amount for r in results], [Decimal(f"{i + 1}00.00") for i in range(4)])
+    
+    def test_parallel_batch_falls_back_to_serial(self):
+        """Test that a failing pool falls back to serial extraction"""
+        texts = [f"Total: ${i + 1}00.00" for i in range(4)]
+        extractor = InvoiceExtractor(ExtractionConfig(use_parallel=True, parallel_min_batch=2))
+        
+        executor = ProcessPoolExecutor(max_workers=1)
+        executor.shutdown()
+        results = extractor.extract_batch(texts, executor)
+        
+        self.assertEqual([r.amount for r in results], [Decimal(f"{i + 1}00.00") for i in range(4)])
 
 
 class TestPreConfiguredExtractors(unittest.TestCase):
@@ -6,10 +6,13 @@ Comprehensive tests to verify OCR functionality and ensure future compatibility
 
 import os
 import sys
+import functools
 import cv2
 import numpy as np
 import tempfile
 from pathlib import Path
+from typing import Tuple
+from PIL import Image
 import unittest
 from unittest.mock import patch, MagicMock
 
@@ -29,104 +32,162 @@ except ImportError as e:
 
 try:
     import pytesseract
-    # Test if tesseract is working
-    pytesseract.get_tesseract_version()
+    # Test if tesseract is working - skipped when the caller exports BILLBOX_TESSERACT_OK=1
+    # to vouch for it, which saves a tesseract subprocess per suite start (and per xdist worker)
+    if os.environ.get('BILLBOX_TESSERACT_OK') != '1':
+        pytesseract.get_tesseract_version()
     TESSERACT_AVAILABLE = True
     print("✓ Tesseract OCR is available")
 except Exception as e:
     TESSERACT_AVAILABLE = False
     print(f"⚠ Tesseract not available: {e}")
 
+# Spreads the suite over one single-threaded worker per core when run as a script
+try:
+    import xdist
+    XDIST_AVAILABLE = True
+except ImportError:
+    XDIST_AVAILABLE = False
+
+
+def _patch_single_threaded_tesseract(test_class) -> None:
+    """Run tesseract single threaded for one test class, restoring the environment afterwards
+    
+    Tesseract's OpenMP threading only adds overhead on images this small
+    (tesseract-ocr/tesseract#263) - parallelism is left to pytest-xdist. A limit the
+    caller already exported is kept.
+    """
+    patcher = patch.dict(os.environ, {'OMP_THREAD_LIMIT': os.environ.get('OMP_THREAD_LIMIT', '1')})
+    patcher.start()
+    test_class.addClassCleanup(patcher.stop)
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_engine(config: OCRConfig = OCRConfig()) -> OCREngine:
+    """Return an engine shared by every test with this configuration (configs are frozen and hashable)"""
+    return OCREngine(config)
+
+
+@functools.lru_cache(maxsize=4)
+def _noise(shape: Tuple[int, ...], high: int) -> np.ndarray:
+    """Return read-only seeded uint8 noise in [0, high), generated once per shape"""
+    noise = np.random.default_rng(0).integers(0, high, shape, dtype=np.uint8)
+    noise.setflags(write=False)
+    return noise
+
 
 class TestOCREngine(unittest.TestCase):
     """Test cases for OCR Engine functionality"""
     
-    def setUp(self):
-        """Set up test fixtures"""
-        self.test_images = {}
-        self.temp_dir = tempfile.mkdtemp()
+    # Unit-test fixtures are drawn at half size and in grayscale - these tests check engine
+    # behaviour, not recognition quality, which the full-size colour realistic invoice covers
+    _SIMPLE_SHAPE = (100, 300)
+    _INVOICE_SHAPE = (200, 300)
+    
+    # Filled text-like boxes as inclusive (x1, y1, x2, y2) corners, as cv2.rectangle draws them
+    _SIMPLE_TEXT_BOXES = (
+        (25, 25, 125, 40),    # "INVOICE"
+        (25, 50, 90, 60),     # "Date:"
+        (100, 50, 160, 60),   # "2024-01-15"
+        (25, 70, 100, 80),    # "Amount:"
+        (110, 70, 150, 80),   # "$123.45"
+    )
+    
+    _INVOICE_LIKE_BOXES = (
+        # Header
+        (25, 15, 150, 30),
+        # Date and invoice number
+        (25, 40, 60, 50),
+        (65, 40, 125, 50),
+        # Customer info
+        (25, 60, 90, 70),
+        (25, 75, 100, 85),
+        (25, 90, 90, 100),
+        # Items table - item, qty and price per row
+        *((x1, 110 + i * 15, x2, 120 + i * 15)
+          for i in range(3) for x1, x2 in ((25, 75), (100, 125), (150, 190))),
+        # Total
+        (150, 165, 190, 175),
+    )
+    
+    # Fixtures the file-based tests read back - the others stay in memory
+    _FILE_FIXTURES = ('simple_text', 'invoice_like')
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up shared fixtures - images are drawn and saved once per class, tests only read them"""
+        _patch_single_threaded_tesseract(cls)
+        cls.test_images = {}
+        cls._temp_dir = tempfile.TemporaryDirectory()
+        cls.temp_dir = cls._temp_dir.name
         
         # Create test images
-        self.test_images['simple_text'] = self._create_simple_text_image()
-        self.test_images['invoice_like'] = self._create_invoice_like_image()
-        self.test_images['noisy'] = self._create_noisy_image()
-        self.test_images['skewed'] = self._create_skewed_image()
-        
-        # Save test images to temporary files
-        self.test_files = {}
-        for name, image in self.test_images.items():
-            file_path = os.path.join(self.temp_dir, f"{name}.png")
-            cv2.imwrite(file_path, cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
-            self.test_files[name] = file_path
-    
-    def tearDown(self):
-        """Clean up test fixtures"""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-    
-    def _create_simple_text_image(self) -> np.ndarray:
-        """Create a simple image with clear text"""
-        image = np.ones((200, 600, 3), dtype=np.uint8) * 255  # White background
+        cls.test_images['simple_text'] = cls._create_simple_text_image()
+        cls.test_images['invoice_like'] = cls._create_invoice_like_image()
+        cls.test_images['noisy'] = cls._create_noisy_image()
+        cls.test_images['skewed'] = cls._create_skewed_image()
+        
+        # Save the images that file-based tests need to temporary files
+        cls.test_files = {}
+        for name in cls._FILE_FIXTURES:
+            image = cls.test_images[name]
+            file_path = os.path.join(cls.temp_dir, f"{name}.png")
+            cv2.imwrite(file_path, image)  # Single-channel PNG
+            cls.test_files[name] = file_path
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up shared fixtures"""
+        cls._temp_dir.cleanup()
+    
+    @staticmethod
+    def _fill_boxes(image: np.ndarray, boxes) -> np.ndarray:
+        """Fill boxes black with slice assignment - no per-rectangle OpenCV call"""
+        for x1, y1, x2, y2 in boxes:
+            image[y1:y2 + 1, x1:x2 + 1] = 0
+        return image
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _create_simple_text_image(cls) -> np.ndarray:
+        """Create a simple image with clear text (drawn once, read-only - the noisy and skewed fixtures derive from it)"""
+        image = np.full(cls._SIMPLE_SHAPE, 255, dtype=np.uint8)  # White background
         
         # Add simple text-like rectangles
-        cv2.rectangle(image, (50, 50), (250, 80), (0, 0, 0), -1)  # "INVOICE"
-        cv2.rectangle(image, (50, 100), (180, 120), (0, 0, 0), -1)  # "Date:"
-        cv2.rectangle(image, (200, 100), (320, 120), (0, 0, 0), -1)  # "2024-01-15"
-        cv2.rectangle(image, (50, 140), (200, 160), (0, 0, 0), -1)  # "Amount:"
-        cv2.rectangle(image, (220, 140), (300, 160), (0, 0, 0), -1)  # "$123.45"
-        
+        cls._fill_boxes(image, cls._SIMPLE_TEXT_BOXES)
+        image.setflags(write=False)
         return image
     
-    def _create_invoice_like_image(self) -> np.ndarray:
+    @classmethod
+    def _create_invoice_like_image(cls) -> np.ndarray:
         """Create an invoice-like image with more complex layout"""
-        image = np.ones((400, 600, 3), dtype=np.uint8) * 255  # White background
-        
-        # Header
-        cv2.rectangle(image, (50, 30), (300, 60), (0, 0, 0), -1)
-        
-        # Date and invoice number
-        cv2.rectangle(image, (50, 80), (120, 100), (0, 0, 0), -1)
-        cv2.rectangle(image, (130, 80), (250, 100), (0, 0, 0), -1)
-        
-        # Customer info
-        cv2.rectangle(image, (50, 120), (180, 140), (0, 0, 0), -1)
-        cv2.rectangle(image, (50, 150), (200, 170), (0, 0, 0), -1)
-        cv2.rectangle(image, (50, 180), (180, 200), (0, 0, 0), -1)
-        
-        # Items table
-        for i in range(3):
-            y = 220 + i * 30
-            cv2.rectangle(image, (50, y), (150, y + 20), (0, 0, 0), -1)  # Item
-            cv2.rectangle(image, (200, y), (250, y + 20), (0, 0, 0), -1)  # Qty
-            cv2.rectangle(image, (300, y), (380, y + 20), (0, 0, 0), -1)  # Price
-        
-        # Total
-        cv2.rectangle(image, (300, 330), (380, 350), (0, 0, 0), -1)
+        image = np.full(cls._INVOICE_SHAPE, 255, dtype=np.uint8)  # White background
         
-        return image
+        return cls._fill_boxes(image, cls._INVOICE_LIKE_BOXES)
     
-    def _create_noisy_image(self) -> np.ndarray:
+    @classmethod
+    def _create_noisy_image(cls) -> np.ndarray:
         """Create an image with noise to test preprocessing"""
-        image = self._create_simple_text_image()
+        image = cls._create_simple_text_image()
         
-        # Add random noise
-        noise = np.random.randint(0, 50, image.shape, dtype=np.uint8)
-        image = cv2.add(image, noise)
+        # Add seeded noise - the same for every run
+        image = cv2.add(image, _noise(image.shape, 50))
         
         # Add some blur
         image = cv2.GaussianBlur(image, (3, 3), 0)
         
         return image
     
-    def _create_skewed_image(self) -> np.ndarray:
+    @classmethod
+    def _create_skewed_image(cls) -> np.ndarray:
         """Create a skewed image to test deskewing"""
-        image = self._create_simple_text_image()
+        image = cls._create_simple_text_image()
         
-        # Apply rotation
+        # Apply rotation - nearest neighbour is enough for solid black-on-white boxes
         center = (image.shape[1] // 2, image.shape[0] // 2)
         rotation_matrix = cv2.getRotationMatrix2D(center, 5, 1.0)  # 5 degree rotation
         image = cv2.warpAffine(image, rotation_matrix, (image.shape[1], image.shape[0]),
-                              borderValue=(255, 255, 255))
+                              flags=cv2.INTER_NEAREST, borderValue=(255, 255, 255))
         
         return image
     
@@ -134,7 +195,7 @@ class TestOCREngine(unittest.TestCase):
     def test_basic_ocr_functionality(self):
         """Test basic OCR functionality"""
         config = OCRConfig(enable_preprocessing=False)  # Test without preprocessing first
-        engine = OCREngine(config)
+        engine = _cached_engine(config)
         
         result = engine.extract_text(self.test_images['simple_text'])
         
@@ -148,7 +209,7 @@ class TestOCREngine(unittest.TestCase):
     def test_ocr_with_preprocessing(self):
         """Test OCR with C++ preprocessing enabled"""
         config = OCRConfig(enable_preprocessing=True, pipeline_type='invoice')
-        engine = OCREngine(config)
+        engine = _cached_engine(config)
         
         result = engine.extract_text(self.test_images['invoice_like'])
         
@@ -168,7 +229,7 @@ class TestOCREngine(unittest.TestCase):
             include_line_boxes=True,
             confidence_threshold=30.0
         )
-        engine = OCREngine(config)
+        engine = _cached_engine(config)
         
         result = engine.extract_text(self.test_images['simple_text'])
         
@@ -193,7 +254,7 @@ class TestOCREngine(unittest.TestCase):
     @unittest.skipUnless(TESSERACT_AVAILABLE, "Tesseract not available")
     def test_file_processing(self):
         """Test processing image files"""
-        engine = create_ocr_engine()
+        engine = _cached_engine()
         
         result = engine.process_image_file(self.test_files['simple_text'])
         
@@ -202,17 +263,108 @@ class TestOCREngine(unittest.TestCase):
     
     def test_file_not_found(self):
         """Test handling of non-existent files"""
-        engine = create_ocr_engine()
+        engine = _cached_engine()
         
         result = engine.process_image_file("non_existent_file.png")
         
         self.assertFalse(result.success)
         self.assertIn("not found", result.error_message.lower())
     
+    def test_reduced_decode_selection(self):
+        """Test that oversized high-DPI scans are decoded at half resolution"""
+        # Only file headers are inspected - the tesseract probe is mocked so this runs without it
+        with patch('ocr_engine.pytesseract.get_tesseract_version', return_value='5.0'):
+            engine = OCREngine(OCRConfig(reduced_decode_min_bytes=0))
+            default_engine = OCREngine()
+        
+        high_dpi_path = os.path.join(self.temp_dir, "high_dpi.png")
+        Image.fromarray(self.test_images['simple_text']).save(high_dpi_path, dpi=(600, 600))
+        self.assertEqual(engine._select_imread_flags(Path(high_dpi_path)), cv2.IMREAD_REDUCED_COLOR_2)
+        
+        # Halving this scan would drop it below the minimum DPI
+        low_dpi_path = os.path.join(self.temp_dir, "low_dpi.png")
+        Image.fromarray(self.test_images['simple_text']).save(low_dpi_path, dpi=(300, 300))
+        self.assertEqual(engine._select_imread_flags(Path(low_dpi_path)), cv2.IMREAD_COLOR)
+        
+        # Without DPI metadata the page size is unknown, so the file is decoded at full size
+        wide_path = os.path.join(self.temp_dir, "wide_no_dpi.png")
+        cv2.imwrite(wide_path, np.full((100, 6000), 255, dtype=np.uint8))
+        self.assertEqual(engine._select_imread_flags(Path(wide_path)), cv2.IMREAD_COLOR)
+        
+        # Small files are never downscaled with the default threshold
+        self.assertEqual(default_engine._select_imread_flags(Path(high_dpi_path)), cv2.IMREAD_COLOR)
+    
+    def test_reduced_decode_box_coordinates(self):
+        """Test that boxes from a reduced decode are reported in file coordinates"""
+        with patch('ocr_engine.pytesseract.get_tesseract_version', return_value='5.0'):
+            engine = OCREngine(OCRConfig(reduced_decode_min_bytes=0, enable_preprocessing=False))
+        
+        high_dpi_path = os.path.join(self.temp_dir, "high_dpi_boxes.png")
+        Image.fromarray(self.test_images['simple_text']).save(high_dpi_path, dpi=(600, 600))
+        
+        # One word at (10, 20) with size 30x40 in the half-resolution image
+        data = {
+            'text': ['TOTAL'], 'conf': ['95'], 'left': [10], 'top': [20], 'width': [30], 'height': [40],
+            'page_num': [1], 'block_num': [1], 'par_num': [1], 'line_num': [1], 'word_num': [1]
+        }
+        with patch('ocr_engine.pytesseract.image_to_string', return_value=b'TOTAL\n'), \
+                patch('ocr_engine.pytesseract.image_to_data', return_value=data) as mock_data:
+            result = engine.process_image_file(high_dpi_path)
+        
+        self.assertTrue(result.success, result.error_message)
+        self.assertEqual(mock_data.call_args[0][0].shape[:2], (50, 150))
+        self.assertEqual(result.preprocessing_stats['decode_scale'], 0.5)
+        for box in (result.word_boxes[0], result.line_boxes[0]):
+            self.assertEqual((box['x'], box['y'], box['width'], box['height']), (20, 40, 60, 80))
+    
+    def test_segment_cache_reuse(self):
+        """Test that repeated segments are not sent to tesseract twice"""
+        config = OCRConfig(
+            enable_segment_cache=True,
+            include_word_boxes=False,
+            include_line_boxes=False
+        )
+        # Tesseract is mocked throughout, so this runs without it installed
+        with patch('ocr_engine.pytesseract.get_tesseract_version', return_value='5.0'):
+            engine = OCREngine(config)
+        
+        with engine, patch('ocr_engine.pytesseract.image_to_string', return_value=b'TEXT\n') as mock_ocr:
+            first = engine.extract_text(self.test_images['invoice_like'])
+            calls_after_first = mock_ocr.call_count
+            second = engine.extract_text(self.test_images['invoice_like'])
+        
+        self.assertTrue(first.success, first.error_message)
+        self.assertEqual(calls_after_first, config.segment_count)
+        self.assertEqual(mock_ocr.call_count, calls_after_first)
+        self.assertEqual(first.text, second.text)
+    
+    def test_segment_cache_closed_with_engine(self):
+        """Test that closing the engine closes the persistent segment cache"""
+        config = OCRConfig(
+            enable_segment_cache=True,
+            segment_cache_path=os.path.join(self.temp_dir, "segments.db")
+        )
+        with patch('ocr_engine.pytesseract.get_tesseract_version', return_value='5.0'):
+            engine = OCREngine(config)
+        
+        self.assertIsNotNone(engine.segment_cache._db)
+        engine.close()
+        self.assertIsNone(engine.segment_cache._db)
+        engine.close()  # Closing twice is harmless
+        
+        # A shared engine stays open until every owner has closed it
+        with patch('ocr_engine.pytesseract.get_tesseract_version', return_value='5.0'):
+            shared = OCREngine(config)
+        self.assertIs(shared.acquire(), shared)
+        shared.close()
+        self.assertIsNotNone(shared.segment_cache._db)
+        shared.close()
+        self.assertIsNone(shared.segment_cache._db)
+    
     @unittest.skipUnless(TESSERACT_AVAILABLE, "Tesseract not available")
     def test_batch_processing(self):
         """Test batch processing of multiple images"""
-        engine = create_ocr_engine()
+        engine = _cached_engine()
         
         image_paths = [
             self.test_files['simple_text'],
@@ -224,6 +376,11 @@ class TestOCREngine(unittest.TestCase):
         self.assertEqual(len(results), 2)
         for result in results:
             self.assertIsInstance(result, OCRResult)
+        
+        # The threaded path returns the same results in input order
+        threaded_results = engine.batch_process_threaded(image_paths, max_workers=2)
+        self.assertEqual([result.text for result in threaded_results],
+                         [result.text for result in results])
     
     def test_configuration_presets(self):
         """Test predefined configuration presets"""
@@ -234,6 +391,9 @@ class TestOCREngine(unittest.TestCase):
             self.assertIsInstance(config, OCRConfig)
             engine = OCREngine(config)
             self.assertIsInstance(engine, OCREngine)
+        
+        # The convenience constructor matches the default configuration
+        self.assertEqual(create_ocr_engine().config, OCRConfig())
     
     def test_preprocessing_fallback(self):
         """Test that OCR works even if C++ preprocessing is unavailable"""
@@ -257,7 +417,7 @@ class TestOCREngine(unittest.TestCase):
             include_word_boxes=True,
             confidence_threshold=80.0  # High threshold
         )
-        engine = OCREngine(config)
+        engine = _cached_engine(config)
         
         result = engine.extract_text(self.test_images['noisy'])  # Noisy image should have lower confidence
         
@@ -280,7 +440,7 @@ class TestOCREngine(unittest.TestCase):
     
     def test_invalid_image_handling(self):
         """Test handling of invalid images"""
-        engine = create_ocr_engine()
+        engine = _cached_engine()
         
         # Test with invalid image data
         invalid_image = np.array([])
@@ -293,18 +453,16 @@ class TestOCREngine(unittest.TestCase):
 class TestOCREngineIntegration(unittest.TestCase):
     """Integration tests for OCR Engine with real scenarios"""
     
-    def setUp(self):
-        """Set up integration test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        """Clean up integration test fixtures"""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    @classmethod
+    def setUpClass(cls):
+        """Run tesseract single threaded for this class"""
+        _patch_single_threaded_tesseract(cls)
     
-    def _create_realistic_invoice(self) -> np.ndarray:
-        """Create a more realistic invoice image with text-like patterns"""
-        image = np.ones((600, 800, 3), dtype=np.uint8) * 255
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _create_realistic_invoice(cls) -> np.ndarray:
+        """Create a more realistic invoice image with text-like patterns (rendered once, read-only)"""
+        image = np.full((600, 800, 3), 255, dtype=np.uint8)
         
         # Company header
         cv2.putText(image, "ACME CORPORATION", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
@@ -335,6 +493,8 @@ class TestOCREngineIntegration(unittest.TestCase):
         # Total
         cv2.putText(image, "TOTAL: $1000.00", (500, 400), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
         
+        # Shared between tests - nothing may draw on it
+        image.setflags(write=False)
         return image
     
     @unittest.skipUnless(TESSERACT_AVAILABLE, "Tesseract not available")
@@ -343,7 +503,7 @@ class TestOCREngineIntegration(unittest.TestCase):
         invoice_image = self._create_realistic_invoice()
         
         # Test with invoice-optimized configuration
-        engine = OCREngine(INVOICE_OCR_CONFIG)
+        engine = _cached_engine(INVOICE_OCR_CONFIG)
         result = engine.extract_text(invoice_image)
         
         self.assertTrue(result.success, f"Realistic invoice OCR failed: {result.error_message}")
@@ -362,21 +522,21 @@ class TestOCREngineIntegration(unittest.TestCase):
         invoice_image = self._create_realistic_invoice()
         
         # Add some noise and skew to make preprocessing more valuable
-        noisy_image = cv2.add(invoice_image, np.random.randint(0, 30, invoice_image.shape, dtype=np.uint8))
+        noisy_image = cv2.add(invoice_image, _noise(invoice_image.shape, 30))
         center = (noisy_image.shape[1] // 2, noisy_image.shape[0] // 2)
         rotation_matrix = cv2.getRotationMatrix2D(center, 3, 1.0)
         skewed_image = cv2.warpAffine(noisy_image, rotation_matrix, 
                                      (noisy_image.shape[1], noisy_image.shape[0]),
-                                     borderValue=(255, 255, 255))
+                                     flags=cv2.INTER_NEAREST, borderValue=(255, 255, 255))
         
         # Test without preprocessing
         config_no_prep = OCRConfig(enable_preprocessing=False)
-        engine_no_prep = OCREngine(config_no_prep)
+        engine_no_prep = _cached_engine(config_no_prep)
         result_no_prep = engine_no_prep.extract_text(skewed_image)
         
         # Test with preprocessing
         config_with_prep = OCRConfig(enable_preprocessing=True, pipeline_type='invoice')
-        engine_with_prep = OCREngine(config_with_prep)
+        engine_with_prep = _cached_engine(config_with_prep)
         result_with_prep = engine_with_prep.extract_text(skewed_image)
         
         # Both should succeed, but preprocessing might improve confidence or text quality
@@ -399,7 +559,7 @@ def create_demo_output():
     print("="*60)
     
     # Create test image
-    image = np.ones((300, 500, 3), dtype=np.uint8) * 255
+    image = np.full((300, 500, 3), 255, dtype=np.uint8)
     cv2.putText(image, "SAMPLE INVOICE", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
     cv2.putText(image, "Date: 2024-01-15", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
     cv2.putText(image, "Amount: $123.45", (50, 130), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
@@ -435,6 +595,12 @@ def main():
     print("BillBox OCR Engine Test Suite")
     print("=" * 50)
     
+    if XDIST_AVAILABLE:
+        import pytest
+        exit_code = pytest.main([__file__, '-n', 'auto'])
+        create_demo_output()
+        return int(exit_code)
+    
     # Run the test suite
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
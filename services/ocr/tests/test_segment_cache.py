@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Segment Cache
+Tests segment splitting, pixel hashing and cache persistence
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+# Add src to path so we can import our modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from segment_cache import SegmentCache, segment_digest, split_segments
+    print("✓ Successfully imported segment cache")
+except ImportError as e:
+    print(f"✗ Failed to import segment cache: {e}")
+    sys.exit(1)
+
+
+class TestSegmentSplitting(unittest.TestCase):
+    """Test cases for split_segments"""
+    
+    def _create_page(self) -> np.ndarray:
+        """Create a white page with three dark text bands"""
+        page = np.full((300, 200), 255, dtype=np.uint8)
+        page[20:60, 20:180] = 0     # Header
+        page[110:190, 20:180] = 0   # Body
+        page[250:280, 20:180] = 0   # Footer
+        return page
+    
+    def test_segments_cover_image(self):
+        """Test that segments tile the image top to bottom"""
+        page = self._create_page()
+        segments = split_segments(page, 3)
+        
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(sum(segment.shape[0] for segment in segments), page.shape[0])
+        np.testing.assert_array_equal(np.vstack(segments), page)
+    
+    def test_cuts_prefer_blank_rows(self):
+        """Test that cuts do not pass through text"""
+        segments = split_segments(self._create_page(), 3)
+        
+        # Every segment after the first starts on a blank row
+        for segment in segments[1:]:
+            self.assertEqual(segment[0].min(), 255)
+    
+    def test_color_page_cut_like_grayscale(self):
+        """Test that multi-channel pages are cut at the same blank rows as grayscale ones"""
+        # Text bands cross both target rows (100 and 200), so the cuts must move to blank rows
+        page = np.full((300, 200), 255, dtype=np.uint8)
+        page[20:60, 20:180] = 0
+        page[90:120, 20:180] = 0
+        page[180:230, 20:180] = 0
+        color_page = np.dstack([page, page, page])
+        
+        gray_heights = [segment.shape[0] for segment in split_segments(page, 3)]
+        color_segments = split_segments(color_page, 3)
+        
+        self.assertEqual([segment.shape[0] for segment in color_segments], gray_heights)
+        for segment in color_segments[1:]:
+            self.assertEqual(segment[0].min(), 255)
+    
+    def test_single_segment(self):
+        """Test that a single segment returns the whole image"""
+        page = self._create_page()
+        segments = split_segments(page, 1)
+        
+        self.assertEqual(len(segments), 1)
+        self.assertIs(segments[0], page)
+
+
+class TestSegmentDigest(unittest.TestCase):
+    """Test cases for segment_digest"""
+    
+    def test_identical_pixels_share_digest(self):
+        """Test that equal segments hash equally, even from different buffers"""
+        segment = np.zeros((10, 20), dtype=np.uint8)
+        page = np.zeros((30, 20), dtype=np.uint8)
+        
+        self.assertEqual(segment_digest(segment), segment_digest(page[10:20]))
+    
+    def test_digest_depends_on_content_shape_and_salt(self):
+        """Test that pixels, shape and salt all change the digest"""
+        segment = np.zeros((10, 20), dtype=np.uint8)
+        changed = segment.copy()
+        changed[5, 5] = 255
+        
+        self.assertNotEqual(segment_digest(segment), segment_digest(changed))
+        self.assertNotEqual(segment_digest(segment), segment_digest(segment.reshape(20, 10)))
+        self.assertNotEqual(segment_digest(segment, b"eng"), segment_digest(segment, b"spa"))
+
+
+class TestSegmentCache(unittest.TestCase):
+    """Test cases for SegmentCache"""
+    
+    def test_memory_cache(self):
+        """Test in-memory get/put and eviction"""
+        cache = SegmentCache(max_entries=2)
+        
+        self.assertIsNone(cache.get(b"a"))
+        cache.put(b"a", b"ACME CORPORATION")
+        cache.put(b"b", b"Thank you")
+        cache.put(b"c", b"Page 1")
+        
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(b"a"))
+        self.assertEqual(cache.get(b"c"), b"Page 1")
+    
+    def test_persistent_cache(self):
+        """Test that entries survive reopening the dbm file"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "vendor", "segments.db")
+            
+            cache = SegmentCache(path)
+            cache.put(b"header", b"ACME CORPORATION")
+            cache.close()
+            
+            reopened = SegmentCache(path)
+            self.assertEqual(reopened.get(b"header"), b"ACME CORPORATION")
+            reopened.close()
+
+
+def main():
+    """Main test runner"""
+    print("Segment Cache Test Suite")
+    print("=" * 50)
+    
+    # Create test suite
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    
+    # Add test cases
+    test_classes = [
+        TestSegmentSplitting,
+        TestSegmentDigest,
+        TestSegmentCache
+    ]
+    
+    for test_class in test_classes:
+        suite.addTests(loader.loadTestsFromTestCase(test_class))
+    
+    # Run tests
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+    
+    success = len(result.failures) == 0 and len(result.errors) == 0
+    print(f"\nOverall: {'✓ PASSED' if success else '✗ FAILED'}")
+    
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())